@@ -2,8 +2,13 @@
 
 import os
 import io
+import re
+import glob
+import gzip
+import json
+import hashlib
 import tempfile
-from flask import Flask, render_template, request, jsonify, send_file, session
+from flask import Flask, render_template, request, jsonify, send_file, session, url_for, make_response
 import pandas as pd
 import matplotlib
 matplotlib.use('Agg')  # Ustawienie backendu bez GUI, dodany komentarz
@@ -11,7 +16,12 @@ import matplotlib.pyplot as plt
 from werkzeug.utils import secure_filename
 import numpy as np
 from pixelpasta.lut_processor.cube_parser import load_cube_file
-from pixelpasta.lut_processor.color_analysis import generate_table
+from pixelpasta.lut_processor.color_analysis import generate_table_from_lut, generate_tables_from_lut
+from pixelpasta.lut_processor.gamuts import COLOR_SPACES, get_color_space
+from pixelpasta.lut_processor.lut_registry import LutRegistry
+from pixelpasta.lut_processor.false_color import false_color_legend
+from pixelpasta.lut_processor.decimation import decimate_curves
+from pixelpasta.lut_processor.stage_cache import StageCache, lut_fingerprint
 import traceback
 import sys
 
@@ -19,17 +29,303 @@ app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # Limit 16MB
 app.secret_key = os.urandom(24) # Generowanie losowego klucza sesji
+app.config['LUT_LIBRARY_DIR'] = os.environ.get('PIXELPASTA_LUT_DIR')  # Katalog biblioteki LUT
+app.config['LUT_LIBRARY_POLL_INTERVAL'] = float(os.environ.get('PIXELPASTA_LUT_POLL_INTERVAL', 2.0))
+
+app.config['MAX_ANALYSIS_SAMPLES'] = 100000
+app.config['ANALYSIS_STORE_MAX_BYTES'] = 64 * 1024 * 1024  # Limit pamięci na wyniki analiz
+app.config['MAX_STORED_LUTS'] = 64  # Liczba przesłanych plików LUT zachowanych do odtwarzania analiz
+app.config['PDF_CHART_POINTS'] = 1000  # Szerokość wykresu w raporcie PDF w pikselach
+
+ANALYSIS_COLUMNS = ('exposure_percentages', 'slog3_percentages', 'rec709_percentages', 'lut_percentages')
+
+# Wyniki analiz przechowywane po stronie serwera jako tablice. Identyfikator
+# analizy zawiera skrót LUT, przestrzeń barwną i liczbę próbek, więc brakujący
+# wpis (restart, inny proces, usunięcie z pamięci) jest liczony ponownie.
+analysis_store = StageCache(max_entries=256, max_bytes=app.config['ANALYSIS_STORE_MAX_BYTES'])
+
+_ANALYSIS_ID_PATTERN = re.compile(r'^([0-9a-f]{32})-([0-9a-f]{8})-(\d+)$')
+
+lut_registry = None
+if app.config['LUT_LIBRARY_DIR']:
+    lut_registry = LutRegistry(app.config['LUT_LIBRARY_DIR'], app.config['LUT_LIBRARY_POLL_INTERVAL'])
+    lut_registry.start()
+
+def color_space_token(color_space):
+    """
+    Zwraca krótki, stały token przestrzeni barwnej używany w identyfikatorze analizy.
+    """
+    return hashlib.blake2b(color_space.encode('utf-8'), digest_size=4).hexdigest()
+
+def make_analysis_id(lut_key, color_space, samples):
+    """
+    Tworzy identyfikator analizy: skrót LUT, token przestrzeni barwnej i liczba próbek (0 - domyślne).
+    """
+    return f'{lut_key}-{color_space_token(color_space)}-{samples or 0}'
+
+def parse_analysis_id(analysis_id):
+    """
+    Odczytuje parametry analizy z identyfikatora.
+
+    Returns:
+        tuple: (skrót LUT, przestrzeń barwna, liczba próbek lub None) albo None dla nieprawidłowego identyfikatora
+    """
+    match = _ANALYSIS_ID_PATTERN.match(analysis_id)
+    if match is None:
+        return None
+    lut_key, token, samples = match.groups()
+    samples = int(samples) or None
+    if samples is not None and not 2 <= samples <= app.config['MAX_ANALYSIS_SAMPLES']:
+        return None
+    for color_space in COLOR_SPACES:
+        if color_space_token(color_space) == token:
+            return lut_key, color_space, samples
+    return None
+
+def exposure_percentages_for(samples):
+    """
+    Zwraca wartości ekspozycji dla podanej liczby próbek lub None (wartości domyślne).
+    """
+    return np.linspace(1, 99, samples).tolist() if samples else None
+
+def requested_samples():
+    """
+    Zwraca liczbę próbek z parametru 'samples' lub None (wartości domyślne).
+    """
+    samples = request.values.get('samples', type=int)
+    if samples is not None and not 2 <= samples <= app.config['MAX_ANALYSIS_SAMPLES']:
+        raise ValueError(f"Liczba próbek musi być z zakresu 2-{app.config['MAX_ANALYSIS_SAMPLES']}")
+    return samples
+
+def stored_lut_path(lut_key):
+    """
+    Zwraca ścieżkę zachowanej kopii przesłanego LUT o podanym skrócie.
+    """
+    return os.path.join(app.config['UPLOAD_FOLDER'], f'pixelpasta-{lut_key}.cube')
+
+def keep_uploaded_lut(filepath, lut_key):
+    """
+    Zachowuje przesłany plik LUT pod nazwą utworzoną z jego skrótu.
+
+    Dzięki temu analizę przesłanego LUT można odtworzyć w dowolnym procesie,
+    a ten sam LUT przesłany pod różnymi nazwami zajmuje jeden plik (nazwa
+    pliku użytkownika jest przechowywana w sesji i w wynikach analizy).
+    Zachowywanych jest najwyżej MAX_STORED_LUTS ostatnio używanych plików.
+    """
+    os.replace(filepath, stored_lut_path(lut_key))
+
+    stored = []
+    for path in glob.glob(os.path.join(app.config['UPLOAD_FOLDER'], 'pixelpasta-*.cube')):
+        try:
+            stored.append((os.path.getmtime(path), path))
+        except OSError:
+            continue  # Plik usunięty równolegle przez inny proces
+    for _, path in sorted(stored, reverse=True)[app.config['MAX_STORED_LUTS']:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def find_lut(lut_key):
+    """
+    Szuka LUT o podanym skrócie w bibliotece i wśród zachowanych plików przesłanych.
+
+    Dla plików przesłanych zwracana jest nazwa zachowanej kopii; nazwa
+    nadana przez użytkownika pochodzi z sesji (get_last_analysis).
+
+    Returns:
+        tuple: (dane LUT, nazwa pliku, interpolator lub None) albo None
+    """
+    entry = lut_registry.find_by_key(lut_key) if lut_registry is not None else None
+    if entry is not None:
+        return entry['lut_data'], entry['filename'], entry['interpolator']
+
+    path = stored_lut_path(lut_key)
+    try:
+        lut_data = load_cube_file(path)
+        os.utime(path)  # Oznaczenie pliku jako ostatnio używanego
+    except (OSError, ValueError):
+        return None
+    if lut_fingerprint(lut_data) != lut_key:
+        return None
+    return lut_data, os.path.basename(path), None
+
+def compute_analysis(lut_data, filename, color_space, samples=None, interpolator=None, lut_key=None):
+    """
+    Generuje tabelę porównawczą i zwraca ją w zwartej postaci do przechowania.
+
+    Returns:
+        dict: 'curves' - tablica float64 (kolumna, punkt) w kolejności ANALYSIS_COLUMNS,
+              'lut_info' - informacje o LUT
+    """
+    comparison_table = generate_table_from_lut(lut_data, color_space, interpolator,
+                                               exposure_percentages=exposure_percentages_for(samples),
+                                               lut_key=lut_key)
+    log_curve = get_color_space(color_space)['log_curve']
+    columns = ['Exposure (%)', f'{log_curve} (%)', 'Rec.709 (%)', 'Your LUT (%)']
+    return {
+        'curves': comparison_table[columns].to_numpy(dtype=np.float64).T.copy(),
+        'lut_info': {
+            'filename': filename,
+            'lut_type': lut_data['lut_type'],
+            'lut_1d_size': lut_data['lut_1d_size'],
+            'lut_3d_size': lut_data['lut_3d_size'],
+            'color_space': color_space,
+            'log_curve': log_curve
+        }
+    }
+
+def run_analysis(lut_data, filename, color_space, interpolator=None, lut_key=None):
+    """
+    Wykonuje (lub odczytuje z pamięci) analizę LUT i zapisuje jej identyfikator w sesji.
+
+    Returns:
+        tuple: (identyfikator analizy, wpis analizy)
+    """
+    color_space = get_color_space(color_space)['name']  # Walidacja i rozwinięcie aliasu
+    samples = requested_samples()
+    if lut_key is None:
+        lut_key = lut_fingerprint(lut_data)
+    analysis_id = make_analysis_id(lut_key, color_space, samples)
+    analysis = analysis_store.get_or_compute(
+        analysis_id, lambda: compute_analysis(lut_data, filename, color_space, samples, interpolator, lut_key))
+    session['last_analysis'] = {'id': analysis_id, 'filename': filename}
+    return analysis_id, with_filename(analysis, filename)
+
+def with_filename(analysis, filename):
+    """
+    Zwraca wpis analizy z podaną nazwą pliku (ten sam LUT mógł zostać przesłany pod inną nazwą).
+    """
+    return {'curves': analysis['curves'], 'lut_info': dict(analysis['lut_info'], filename=filename)}
+
+def get_analysis(analysis_id):
+    """
+    Zwraca wpis analizy z pamięci lub liczy go ponownie na podstawie identyfikatora.
+
+    Returns:
+        dict: Wpis analizy albo None, jeśli identyfikator jest nieprawidłowy lub LUT jest niedostępny
+    """
+    analysis = analysis_store.get(analysis_id)
+    if analysis is not None:
+        return analysis
+    parameters = parse_analysis_id(analysis_id)
+    if parameters is None:
+        return None
+    lut_key, color_space, samples = parameters
+    found = find_lut(lut_key)
+    if found is None:
+        return None
+    lut_data, filename, interpolator = found
+    return analysis_store.get_or_compute(
+        analysis_id, lambda: compute_analysis(lut_data, filename, color_space, samples, interpolator, lut_key))
+
+def get_last_analysis():
+    """
+    Zwraca identyfikator i wpis ostatniej analizy z sesji albo None.
+    """
+    last = session.get('last_analysis')
+    analysis = get_analysis(last['id']) if last else None
+    if analysis is None:
+        return None
+    return last['id'], with_filename(analysis, last['filename'])
+
+def analysis_response(analysis_id, analysis):
+    """
+    Zwraca wyniki analizy jako JSON, przerzedzone do szerokości wykresu.
+
+    Parametr 'width' określa szerokość wykresu w pikselach. Krzywe są
+    przerzedzane algorytmem LTTB do najwyżej 'width' (co najmniej 3) punktów, a pełne dane
+    są dostępne pod 'full_data_url'.
+    """
+    curves = analysis['curves']
+    total_points = curves.shape[1]
+    width = request.values.get('width', type=int)
+
+    if width and width > 0 and total_points > width:
+        # LTTB zachowuje pierwszy i ostatni punkt, więc potrzebuje co najmniej 3 punktów
+        curves = curves[:, decimate_curves(curves[0], curves[1:], max(width, 3))]
+    decimated = curves.shape[1] < total_points
+
+    payload = {column: values.tolist() for column, values in zip(ANALYSIS_COLUMNS, curves)}
+    payload['lut_info'] = analysis['lut_info']
+    payload['analysis_id'] = analysis_id
+    payload['total_points'] = total_points
+    payload['full_data_url'] = url_for('download_full_data', analysis_id=analysis_id)
+    payload['decimated'] = decimated
+    return jsonify(payload)
 
 @app.route('/')
 def index():
-    return render_template('upload.html')
+    return render_template('upload.html', color_spaces=COLOR_SPACES.values())
+
+@app.route('/api/color-spaces', methods=['GET'])
+def list_color_spaces():
+    return jsonify({'color_spaces': [
+        {'name': entry['name'], 'label': entry['label'], 'log_curve': entry['log_curve']}
+        for entry in COLOR_SPACES.values()
+    ]})
+
+@app.route('/api/luts', methods=['GET'])
+def list_luts():
+    if lut_registry is None:
+        return jsonify({'luts': []})
+    return jsonify({'luts': lut_registry.list_luts()})
+
+def analyze_registered_lut(name):
+    entry = lut_registry.get(name) if lut_registry is not None else None
+    if entry is None:
+        return jsonify({'error': f'Nie znaleziono LUT: {name}'}), 404
+
+    color_space = request.args.get('color-space', 'S-Gamut3')
+    try:
+        return analysis_response(*run_analysis(entry['lut_data'], entry['filename'], color_space,
+                                               entry['interpolator'], entry['lut_key']))
+    except ValueError as ve:
+        return jsonify({'error': f'Błąd wartości: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Nieoczekiwany błąd: {str(e)}'}), 500
+
+@app.route('/api/compare', methods=['GET'])
+def compare_color_spaces():
+    # Analiza LUT z biblioteki dla wielu przestrzeni barwnych w jednym przebiegu
+    name = request.args.get('lut')
+    entry = lut_registry.get(name) if lut_registry is not None and name else None
+    if entry is None:
+        return jsonify({'error': f'Nie znaleziono LUT: {name}'}), 404
+
+    color_spaces = request.args.getlist('color-space') or list(COLOR_SPACES)
+    try:
+        tables = generate_tables_from_lut(entry['lut_data'], color_spaces, entry['interpolator'],
+                                          lut_key=entry['lut_key'])
+    except ValueError as ve:
+        return jsonify({'error': f'Błąd wartości: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Nieoczekiwany błąd: {str(e)}'}), 500
+
+    first_table = tables[color_spaces[0]]
+    return jsonify({
+        'exposure_percentages': first_table['Exposure (%)'].tolist(),
+        'rec709_percentages': first_table['Rec.709 (%)'].tolist(),
+        'lut_percentages': {
+            color_space: table['Your LUT (%)'].tolist() for color_space, table in tables.items()
+        },
+        'lut_info': {
+            'filename': entry['filename'],
+            'lut_type': entry['lut_data']['lut_type'],
+            'lut_1d_size': entry['lut_data']['lut_1d_size'],
+            'lut_3d_size': entry['lut_data']['lut_3d_size']
+        }
+    })
 
 @app.route('/api/analyze', methods=['POST', 'GET'])
 def analyze_lut():
     # Użycie sesji do przechowywania danych
     if request.method == 'GET':
-        if 'last_analysis_results' in session:
-            return jsonify(session['last_analysis_results'])
+        if request.args.get('lut'):
+            return analyze_registered_lut(request.args['lut'])
+        last = get_last_analysis()
+        if last is not None:
+            return analysis_response(*last)
         else:
             return jsonify({'error': 'Brak danych analizy'}), 404
 
@@ -59,32 +355,11 @@ def analyze_lut():
     file.save(filepath)
     
     try:
-        comparison_table = generate_table(filepath, color_space)
-        
-        exposure_percentages = comparison_table['Exposure (%)'].tolist()
-        slog3_percentages = comparison_table['S-Log3 (%)'].tolist()
-        rec709_percentages = comparison_table['Rec.709 (%)'].tolist()
-        lut_percentages = comparison_table['Your LUT (%)'].tolist()
-        
         lut_data = load_cube_file(filepath)
-        lut_info = {
-            'filename': filename,
-            'lut_type': lut_data['lut_type'],
-            'lut_1d_size': lut_data['lut_1d_size'],
-            'lut_3d_size': lut_data['lut_3d_size'],
-            'color_space': color_space
-        }
-        
-        session['last_analysis_results'] = {
-            'exposure_percentages': exposure_percentages,
-            'slog3_percentages': slog3_percentages,
-            'rec709_percentages': rec709_percentages,
-            'lut_percentages': lut_percentages,
-            'lut_info': lut_info
-        }
-        session['last_comparison_table'] = comparison_table.to_dict(orient='records') # Zapis do sesji jako lista słowników
-        
-        return jsonify(session['last_analysis_results'])
+        lut_key = lut_fingerprint(lut_data)
+        response = analysis_response(*run_analysis(lut_data, filename, color_space, lut_key=lut_key))
+        keep_uploaded_lut(filepath, lut_key)
+        return response
     
     except ValueError as ve:
         return jsonify({'error': f'Błąd wartości: {str(ve)}'}), 400
@@ -97,13 +372,67 @@ def analyze_lut():
         if os.path.exists(filepath):
             os.remove(filepath)
 
+@app.route('/api/analysis/<analysis_id>/full', methods=['GET'])
+def download_full_data(analysis_id):
+    """
+    Zwraca pełne dane analizy w zwartym formacie binarnym lub jako JSON.
+
+    Format binarny ('format=binary', domyślny) to tablica float32 little-endian
+    o wymiarach (liczba kolumn, liczba punktów); nazwy kolumn i liczba punktów
+    są podawane w nagłówkach X-Columns i X-Points. Odpowiedź jest kompresowana
+    gzipem, jeśli klient to obsługuje, i wspiera warunkowe GET przez ETag.
+    """
+    analysis = get_analysis(analysis_id)
+    if analysis is None:
+        return jsonify({'error': 'Brak danych analizy'}), 404
+
+    curves = analysis['curves']
+    data_format = request.args.get('format', 'binary')
+    use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+
+    if data_format == 'binary':
+        body = curves.astype('<f4').tobytes()
+        mimetype = 'application/octet-stream'
+    elif data_format == 'json':
+        results = {column: values.tolist() for column, values in zip(ANALYSIS_COLUMNS, curves)}
+        results['lut_info'] = analysis['lut_info']
+        body = json.dumps(results).encode('utf-8')
+        mimetype = 'application/json'
+    else:
+        return jsonify({'error': 'Nieobsługiwany format danych'}), 400
+
+    if use_gzip:
+        body = gzip.compress(body, compresslevel=6)
+
+    response = make_response(body)
+    response.mimetype = mimetype
+    response.headers['X-Points'] = str(curves.shape[1])
+    response.headers['X-Columns'] = ','.join(ANALYSIS_COLUMNS)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    # Dane analizy o danym identyfikatorze nigdy się nie zmieniają
+    response.set_etag(f"{analysis_id}-{data_format}{'-gzip' if use_gzip else ''}")
+    return response.make_conditional(request)
+
 @app.route('/api/download/csv', methods=['GET'])
 def download_csv():
-    if 'last_comparison_table' not in session:
+    last = get_last_analysis()
+    if last is None:
         return jsonify({'error': 'Brak danych do pobrania'}), 400
-    
+
     try:
-        comparison_table = pd.DataFrame(session['last_comparison_table']) # Odczyt z sesji
+        lut_info = last[1]['lut_info']
+        exposure, slog3, rec709, lut = last[1]['curves']
+        comparison_table = pd.DataFrame({
+            # Domyślne ekspozycje są całkowite - zapis bez części ułamkowej jak w tabeli źródłowej
+            'Exposure (%)': exposure.astype(int) if np.all(exposure == np.round(exposure)) else exposure,
+            f"{lut_info['log_curve']} (%)": slog3,
+            'Rec.709 (%)': rec709,
+            'Your LUT (%)': lut,
+            'Color Space': lut_info['color_space']
+        })
         csv_data = io.StringIO()
         comparison_table.to_csv(csv_data, index=False)
         
@@ -123,20 +452,21 @@ def download_csv():
 
 @app.route('/api/download/pdf', methods=['GET'])
 def download_pdf():
-    if 'last_analysis_results' not in session:
+    last = get_last_analysis()
+    if last is None:
         return jsonify({'error': 'Brak danych do pobrania'}), 400
     
     try:
         plt.figure(figsize=(10, 6))
             
-        exposure = session['last_analysis_results']['exposure_percentages']
-        slog3 = session['last_analysis_results']['slog3_percentages']
-        rec709 = session['last_analysis_results']['rec709_percentages']
-        lut = session['last_analysis_results']['lut_percentages']
-            
-        plt.plot(exposure, slog3, label='S-Log3', color='blue')
-        plt.plot(exposure, rec709, label='Rec.709', color='red')
-        plt.plot(exposure, lut, label='Twój LUT', color='green')
+        curves = last[1]['curves']
+        lut_info = last[1]['lut_info']
+        log_curve = lut_info['log_curve']
+        # Wykres nie pokaże więcej punktów niż ma pikseli - pełne dane są dostępne pod /api/analysis/<id>/full
+        chart_curves = curves[:, decimate_curves(curves[0], curves[1:], app.config['PDF_CHART_POINTS'])]
+        plt.plot(chart_curves[0], chart_curves[1], label=log_curve, color='blue')
+        plt.plot(chart_curves[0], chart_curves[2], label='Rec.709', color='red')
+        plt.plot(chart_curves[0], chart_curves[3], label='Twój LUT', color='green')
         
         plt.title('Porównanie krzywych tonalnych')
         plt.xlabel('Ekspozycja (%)')
@@ -154,16 +484,28 @@ def download_pdf():
         from reportlab.lib import colors
         from reportlab.platypus import Table, TableStyle
         from reportlab.lib.units import inch
+        from reportlab.lib.utils import ImageReader
         from PIL import Image
         
-        table_data = [['Ekspozycja (%)', 'S-Log3 (%)', 'Rec.709 (%)', 'Twój LUT (%)']]
-        for i in range(len(exposure)):
-            table_data.append([
-                str(exposure[i]),
-                f"{slog3[i]:.2f}",
-                f"{rec709[i]:.2f}",
-                f"{lut[i]:.2f}"
-            ])
+        def table_row(i):
+            exposure = curves[0, i]
+            return [
+                f"{exposure:g}" if exposure == round(exposure) else f"{exposure:.2f}",
+                f"{curves[1, i]:.2f}",
+                f"{curves[2, i]:.2f}",
+                f"{curves[3, i]:.2f}"
+            ]
+
+        table_header = ['Ekspozycja (%)', f'{log_curve} (%)', 'Rec.709 (%)', 'Twój LUT (%)']
+        table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
         
         pdf_data = io.BytesIO()
         c = canvas.Canvas(pdf_data, pagesize=letter)
@@ -174,7 +516,6 @@ def download_pdf():
         
         c.setFont("Helvetica", 12)
         y_position = height - 1.5 * inch
-        lut_info = session['last_analysis_results']['lut_info']
         
         c.drawString(inch, y_position, f"Nazwa pliku: {lut_info['filename']}")
         y_position -= 20
@@ -189,30 +530,75 @@ def download_pdf():
         display_width = width - 2 * inch
         display_height = display_width * aspect
         
-        c.drawImage(img_data, inch, y_position - display_height, width=display_width, height=display_height)
-        y_position -= display_height + 40
+        img_data.seek(0)
+        c.drawImage(ImageReader(img_data), inch, y_position - display_height, width=display_width, height=display_height)
         
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(inch, y_position, "Tabela porównawcza:")
-        y_position -= 30
+        c.setFont("Helvetica", 10)
+        c.drawString(inch, inch, "Wygenerowano przez PixelPasta")
+        c.drawRightString(width - inch, inch, "Strona 1 z 3")
+        c.showPage()
+        
+        # Tabela na osobnej stronie
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(inch, height - inch, "Tabela porównawcza")
+        y_position = height - 1.5 * inch
         
-        table = Table(table_data)
-        table.setStyle(TableStyle([
+        # Tabela ograniczona do wierszy mieszczących się nad stopką strony,
+        # wybranych równomiernie z całego zakresu ekspozycji
+        sample_table = Table([table_header, table_row(0)])
+        sample_table.setStyle(table_style)
+        sample_table.wrapOn(c, width, height)
+        header_height, row_height = sample_table._rowHeights
+        max_rows = max(int((y_position - 1.5 * inch - header_height) // row_height), 2)
+        total_points = curves.shape[1]
+        if total_points > max_rows:
+            rows = np.unique(np.round(np.linspace(0, total_points - 1, max_rows)).astype(int))
+        else:
+            rows = range(total_points)
+
+        table = Table([table_header] + [table_row(i) for i in rows])
+        table.setStyle(table_style)
+        table.wrapOn(c, width, height)
+        table.drawOn(c, inch, y_position - table._height)
+        
+        c.setFont("Helvetica", 10)
+        c.drawString(inch, inch, "Wygenerowano przez PixelPasta")
+        c.drawRightString(width - inch, inch, "Strona 2 z 3")
+        c.showPage()
+
+        # Legenda kolorów fałszywych wyznaczona z krzywej 'Twój LUT (%)'
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(inch, height - inch, "Legenda kolorów fałszywych")
+
+        legend = false_color_legend(curves[0], curves[3])
+        legend_data = [['', 'Pasmo', 'IRE (%)', 'Ekspozycja (%)']]
+        for band in legend:
+            if band['exposure_min'] is None:
+                exposure_range = 'poza zakresem LUT'
+            else:
+                exposure_range = f"{band['exposure_min']:.1f} - {band['exposure_max']:.1f}"
+            legend_data.append(['', band['label'], f"{band['min']:g} - {band['max']:g}", exposure_range])
+
+        legend_style = [
             ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
             ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
             ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
             ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
             ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        ]
+        for row, band in enumerate(legend, 1):
+            swatch = colors.Color(*(channel / 255.0 for channel in band['color']))
+            legend_style.append(('BACKGROUND', (0, row), (0, row), swatch))
+
+        legend_table = Table(legend_data, colWidths=[0.5 * inch, 2.5 * inch, 1.25 * inch, 1.75 * inch])
+        legend_table.setStyle(TableStyle(legend_style))
+        legend_table.wrapOn(c, width, height)
+        legend_table.drawOn(c, inch, height - 1.5 * inch - legend_table._height)
 
-        table.wrapOn(c, width, height)
-        table.drawOn(c, inch, y_position - table._height)
-        
         c.setFont("Helvetica", 10)
         c.drawString(inch, inch, "Wygenerowano przez PixelPasta")
-        c.drawRightString(width - inch, inch, "Strona 1 z 1")
+        c.drawRightString(width - inch, inch, "Strona 3 z 3")
 
         c.save()
         pdf_data.seek(0)
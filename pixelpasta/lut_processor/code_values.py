@@ -0,0 +1,225 @@
+import numpy as np
+from .color_analysis import create_lut_interpolator, interpolate_1d_lut
+
+# Obrazy całkowitoliczbowe mają najwyżej 2^bit_depth różnych wartości w każdym
+# kanale, więc etapy działające niezależnie na kanałach można policzyć raz dla
+# każdej wartości kodu, a potem tylko odczytywać z tablicy.
+
+def code_value_inputs(dtype, bit_depth=None):
+    """
+    Zwraca znormalizowane wartości wejściowe (0-1) dla wszystkich kodów.
+
+    Args:
+        dtype (numpy.dtype): Typ całkowity bez znaku (np. uint8, uint16)
+        bit_depth (int, optional): Rzeczywista głębia bitowa danych (np. 10 lub 12 w uint16)
+
+    Returns:
+        numpy.ndarray: Wartości wejściowe o długości 2^bit_depth
+    """
+    info = np.iinfo(dtype)
+    if info.min != 0 or info.bits > 16:
+        raise ValueError("Obsługiwane są tylko typy całkowite bez znaku do 16 bitów")
+    if bit_depth is None:
+        bit_depth = info.bits
+    if not 1 <= bit_depth <= info.bits:
+        raise ValueError(f"Nieprawidłowa głębia bitowa {bit_depth} dla typu {np.dtype(dtype).name}")
+    max_code = (1 << bit_depth) - 1
+    return np.arange(max_code + 1, dtype=np.float64) / max_code
+
+def effective_bit_depth(dtype, bit_depth=None):
+    """
+    Zwraca głębię bitową obowiązującą dla danego typu obrazu.
+
+    Zadeklarowana głębia (np. 10 bitów w uint16) dotyczy tylko typów, które
+    ją mieszczą; obrazy o mniejszym typie (np. 8-bitowe klatki w tej samej
+    sekwencji) używają głębi swojego typu.
+
+    Args:
+        dtype (numpy.dtype): Typ całkowity obrazu
+        bit_depth (int, optional): Zadeklarowana głębia bitowa
+
+    Returns:
+        int: Głębia bitowa lub None (głębia typu)
+    """
+    if bit_depth is not None and bit_depth > np.iinfo(dtype).bits:
+        return None
+    return bit_depth
+
+def check_code_values(image, max_code):
+    """
+    Sprawdza, czy wartości kodu obrazu mieszczą się w tablicach kodów.
+
+    Args:
+        image (numpy.ndarray): Obraz całkowity
+        max_code (int): Największa obsługiwana wartość kodu
+
+    Raises:
+        ValueError: Gdy obraz zawiera wartość spoza zakresu głębi bitowej
+    """
+    if max_code < np.iinfo(image.dtype).max and image.size:
+        image_max = int(image.max())
+        if image_max > max_code:
+            raise ValueError(
+                f"Wartość kodu {image_max} przekracza zakres głębi bitowej (0-{max_code})")
+
+def gather_channels(image, table):
+    """
+    Odczytuje z tablicy wartości dla każdego kanału obrazu całkowitego.
+
+    Args:
+        image (numpy.ndarray): Obraz całkowity o kształcie (..., 3)
+        table (numpy.ndarray): Tablica (liczba kodów, 3)
+
+    Returns:
+        numpy.ndarray: Obraz o kształcie (..., 3) i typie tablicy
+    """
+    channel_tables = np.ascontiguousarray(table.T)
+    output = np.empty(image.shape, dtype=table.dtype)
+    for channel in range(3):
+        output[..., channel] = channel_tables[channel].take(image[..., channel])
+    return output
+
+def lattice_coordinates(values, lut_size):
+    """
+    Zamienia wartości 0-1 na indeks węzła siatki LUT i wagę interpolacji.
+
+    Args:
+        values (numpy.ndarray): Wartości wejściowe (0-1)
+        lut_size (int): Rozmiar siatki LUT
+
+    Returns:
+        tuple: (indeks dolnego węzła, waga górnego węzła)
+    """
+    scaled = np.clip(values, 0, 1) * (lut_size - 1)
+    index = np.minimum(np.floor(scaled).astype(np.intp), lut_size - 2)
+    return index, (scaled - index).astype(np.float32)
+
+def interpolate_3d_lattice(lut_3d, lut_size, base, weight_r, weight_g, weight_b):
+    """
+    Interpolacja trójliniowa 3D LUT dla wcześniej wyznaczonych współrzędnych siatki.
+
+    Args:
+        lut_3d (numpy.ndarray): Dane 3D LUT w kolejności pliku .CUBE (R zmienia się najszybciej),
+            o kształcie (lut_size^3, 3) lub (lut_size^3,) dla siatki wartości skalarnych
+        lut_size (int): Rozmiar LUT
+        base (numpy.ndarray): Indeks wiersza lut_3d dla dolnego narożnika komórki siatki
+        weight_r (numpy.ndarray): Waga górnego węzła dla kanału R
+        weight_g (numpy.ndarray): Waga górnego węzła dla kanału G
+        weight_b (numpy.ndarray): Waga górnego węzła dla kanału B
+
+    Returns:
+        numpy.ndarray: Interpolowane wartości wyjściowe (R, G, B) lub wartości skalarne
+    """
+    stride_g = lut_size
+    stride_b = lut_size * lut_size
+    if lut_3d.ndim > 1:
+        weight_r = weight_r[..., None]
+        weight_g = weight_g[..., None]
+        weight_b = weight_b[..., None]
+
+    def lerp(low, high, weight):
+        # Wynik zapisywany w miejscu, aby nie tworzyć kolejnych tablic tymczasowych
+        high -= low
+        high *= weight
+        low += high
+        return low
+
+    def corner_row(offset):
+        # Odczyt z przesuniętego widoku zamiast tworzenia tablicy base + offset
+        return lerp(lut_3d[offset:].take(base, axis=0), lut_3d[offset + 1:].take(base, axis=0), weight_r)
+
+    # Interpolacja kolejno wzdłuż osi R, G i B
+    planes = [lerp(corner_row(offset_b), corner_row(offset_b + stride_g), weight_g) for offset_b in (0, stride_b)]
+    return lerp(planes[0], planes[1], weight_b)
+
+def create_code_value_transform(lut_data, dtype, bit_depth=None, channel_stage=None):
+    """
+    Tworzy funkcję nakładającą LUT na obraz całkowity przy użyciu tablic kodów.
+
+    Dla 1D LUT cały łańcuch (LUT i etap kanałowy) jest liczony raz dla każdej
+    wartości kodu i sprowadza się do jednego odczytu z tablicy na kanał. Dla
+    3D LUT z tablicy odczytywane są współrzędne siatki, a etap kanałowy jest
+    nakładany po interpolacji. Tablica wstępna 1D LUT typu 'both' działa
+    niezależnie na kanałach, więc wchodzi do tablic współrzędnych siatki.
+
+    Args:
+        lut_data (dict): Dane LUT zwrócone przez load_cube_file
+        dtype (numpy.dtype): Typ całkowity obrazów wejściowych
+        bit_depth (int, optional): Rzeczywista głębia bitowa danych
+        channel_stage (callable, optional): Funkcja działająca niezależnie na kanałach wyjścia LUT
+
+    Returns:
+        callable: Funkcja (obraz całkowity) -> obraz (..., 3)
+    """
+    inputs = code_value_inputs(dtype, bit_depth)
+    max_code = len(inputs) - 1
+
+    if lut_data['lut_type'] == '1D':
+        table = create_lut_interpolator(lut_data)(inputs, inputs, inputs)
+        if channel_stage is not None:
+            table = channel_stage(table)
+        if table.dtype == np.float64:
+            table = table.astype(np.float32)
+
+        def transform(image):
+            check_code_values(image, max_code)
+            return gather_channels(image, table)
+    elif lut_data['lut_type'] == '3D' or lut_data['lut_type'] == 'both':
+        lut_size = lut_data['lut_3d_size']
+        lut_3d = lut_data['lut_3d'].astype(np.float32)
+        if lut_data['lut_type'] == 'both':
+            shaped = interpolate_1d_lut(lut_data['lut_1d'], inputs, inputs, inputs)
+        else:
+            shaped = np.stack([inputs, inputs, inputs], axis=-1)
+        index, weight = lattice_coordinates(shaped, lut_size)
+        # Przesunięcia wierszy lut_3d i wagi dla każdego kanału, liczone raz na wartość kodu
+        offsets = [np.ascontiguousarray(index[:, c]) * lut_size ** c for c in range(3)]
+        weights = [np.ascontiguousarray(weight[:, c]) for c in range(3)]
+
+        def transform(image):
+            check_code_values(image, max_code)
+            base = sum(offsets[c].take(image[..., c]) for c in range(3))
+            output = interpolate_3d_lattice(lut_3d, lut_size, base,
+                                            *(weights[c].take(image[..., c]) for c in range(3)))
+            if channel_stage is not None:
+                output = channel_stage(output)
+            return output
+    else:
+        raise ValueError("Nie można określić typu LUT.")
+
+    return transform
+
+def create_image_transform(lut_data, channel_stage=None, bit_depth=None):
+    """
+    Tworzy funkcję nakładającą LUT na obrazy dowolnego typu.
+
+    Obrazy całkowite korzystają z tablic kodów (budowanych raz dla każdego
+    typu), a obrazy zmiennoprzecinkowe (0-1) z interpolatora LUT.
+
+    Args:
+        lut_data (dict): Dane LUT zwrócone przez load_cube_file
+        channel_stage (callable, optional): Funkcja działająca niezależnie na kanałach wyjścia LUT
+        bit_depth (int, optional): Rzeczywista głębia bitowa obrazów całkowitych; dla
+            typów mniejszych niż ta głębia używana jest głębia typu
+
+    Returns:
+        callable: Funkcja (obraz) -> obraz (..., 3)
+    """
+    interpolator = create_lut_interpolator(lut_data)
+    code_value_transforms = {}
+
+    def transform(image):
+        if np.issubdtype(image.dtype, np.integer):
+            code_value_transform = code_value_transforms.get(image.dtype)
+            if code_value_transform is None:
+                code_value_transform = create_code_value_transform(
+                    lut_data, image.dtype, effective_bit_depth(image.dtype, bit_depth), channel_stage)
+                code_value_transforms[image.dtype] = code_value_transform
+            return code_value_transform(image)
+
+        output = interpolator(image[..., 0], image[..., 1], image[..., 2])
+        if channel_stage is not None:
+            output = channel_stage(output)
+        return output
+
+    return transform
@@ -1,57 +1,19 @@
+import os
 import numpy as np
 import pandas as pd
 from scipy.interpolate import RegularGridInterpolator
 from .cube_parser import load_cube_file
+from .stage_cache import StageCache, lut_fingerprint, samples_fingerprint
+from .gamuts import slog3_curve, inverse_slog3_curve, get_color_space, get_log_curve, stacked_matrices
 
-def slog3_curve(L):
-    """
-    Konwertuje wartości liniowe na S-Log3.
+# Współczynniki luminancji Rec.709: Y = 0.2126 R + 0.7152 G + 0.0722 B
+REC709_LUMINANCE_WEIGHTS = np.array([0.2126, 0.7152, 0.0722])
 
-    Args:
-        L (numpy.ndarray): Wartości liniowe (0-1)
-
-    Returns:
-        numpy.ndarray: Wartości S-Log3 (0-1)
-    """
-    L = np.clip(L, 0, 1)  # Upewnienie się, że wartości są w zakresie [0, 1]
-    a = 0.432699
-    b = 0.009468
-    c = 0.655
-    d = 0.037584
-    e = 0.01
-    L_threshold = 0.01125000
-
-    V = np.where(
-        L >= L_threshold,
-        a * np.log10(L + b) + c,
-        d * L + e
-    )
-    return V
-
-def inverse_slog3_curve(V):
-    """
-    Konwertuje wartości S-Log3 na liniowe.
-
-    Args:
-        V (numpy.ndarray): Wartości S-Log3 (0-1)
-
-    Returns:
-        numpy.ndarray: Wartości liniowe (0-1)
-    """
-    V = np.clip(V, 0, 1)  # Upewnienie się, że wartości są w zakresie [0, 1]
-    a = 0.432699
-    b = 0.009468
-    c = 0.655
-    d = 0.037584
-    e = 0.01
-    V_threshold = slog3_curve(0.01125)
+DEFAULT_EXPOSURE_PERCENTAGES = list(range(1, 100, 5))  # Od 1% do 99% z krokiem 5%
 
-    L = np.where(
-        V >= V_threshold,
-        np.power(10, (V - c) / a) - b,
-        (V - e) / d
-    )
-    return L
+# Wyniki etapów generate_table zapamiętane dla danego LUT i zestawu próbek;
+# limit rozmiaru chroni przed zapełnieniem pamięci analizami o wielu próbkach
+stage_cache = StageCache(max_bytes=256 * 1024 * 1024)
 
 def rec709_oetf(L):
     """
@@ -96,6 +58,22 @@ def interpolate_1d_lut(lut_1d, input_values_r, input_values_g, input_values_b):
 
     return np.stack([output_values_r, output_values_g, output_values_b], axis=-1)
 
+def create_3d_interpolator(lut_3d, lut_size):
+    """
+    Tworzy interpolator siatki 3D LUT, który można wielokrotnie wykorzystać.
+
+    Args:
+        lut_3d (numpy.ndarray): Dane 3D LUT o kształcie (lut_size^3, 3) lub (lut_size^3,)
+        lut_size (int): Rozmiar LUT
+
+    Returns:
+        scipy.interpolate.RegularGridInterpolator: Interpolator siatki LUT
+    """
+    grid = np.linspace(0, 1, lut_size)
+    # W pliku .CUBE indeks R zmienia się najszybciej, więc dane są ułożone jako [B, G, R]
+    lut_3d = lut_3d.reshape((lut_size, lut_size, lut_size) + lut_3d.shape[1:]).swapaxes(0, 2)
+    return RegularGridInterpolator((grid, grid, grid), lut_3d, bounds_error=False, fill_value=0)
+
 def interpolate_3d_lut(lut_3d, lut_size, input_values_r, input_values_g, input_values_b):
     """
     Interpoluje wartości z 3D LUT.
@@ -109,9 +87,7 @@ def interpolate_3d_lut(lut_3d, lut_size, input_values_r, input_values_g, input_v
     Returns:
         numpy.ndarray: Interpolowane wartości wyjściowe (R, G, B)
     """
-    grid = np.linspace(0, 1, lut_size)
-    lut_3d = lut_3d.reshape((lut_size, lut_size, lut_size, 3))
-    interpolator = RegularGridInterpolator((grid, grid, grid), lut_3d, bounds_error=False, fill_value=0)
+    interpolator = create_3d_interpolator(lut_3d, lut_size)
 
     input_points = np.stack([input_values_r, input_values_g, input_values_b], axis=-1)
     output_values = interpolator(input_points)
@@ -120,97 +96,316 @@ def interpolate_3d_lut(lut_3d, lut_size, input_values_r, input_values_g, input_v
 
 def srgb_to_rec709(rgb_values, color_space='S-Gamut3'):
     """
-    Konwertuje wartości RGB z przestrzeni S-Gamut3 lub S-Gamut3.Cine do Rec.709.
+    Konwertuje wartości RGB z przestrzeni barwnej kamery do Rec.709.
 
     Args:
         rgb_values (numpy.ndarray): Wartości RGB
-        color_space (str): Przestrzeń barwna ('S-Gamut3' lub 'S-Gamut3.Cine')
+        color_space (str): Przestrzeń barwna z rejestru gamuts (np. 'S-Gamut3' lub 'S-Gamut3.Cine')
 
     Returns:
         numpy.ndarray: Wartości RGB w przestrzeni Rec.709
     """
-    if color_space == 'S-Gamut3':
-        matrix = np.array([
-            [1.6410, -0.3245, -0.3165],
-            [-0.6636, 1.6157, 0.0479],
-            [0.0117, -0.0085, 0.9968]
-        ])
-    elif color_space == 'S-Gamut3.Cine':
-        matrix = np.array([
-            [1.5529, -0.2555, -0.2974],
-            [-0.5428, 1.5027, 0.0401],
-            [-0.0026, -0.0186, 1.0212]
-        ])
-    else:
-        raise ValueError("Nieobsługiwana przestrzeń barwna. Wybierz 'S-Gamut3' lub 'S-Gamut3.Cine'")
-
+    matrix = get_color_space(color_space)['matrix']
     return np.dot(rgb_values, matrix.T)
 
-def generate_table(lut_filename, color_space):
+def srgb_to_rec709_stacked(rgb_values, color_spaces):
     """
-    Generuje tabelę porównawczą dla pliku LUT.
+    Konwertuje wartości RGB do Rec.709 dla wielu przestrzeni barwnych naraz.
 
     Args:
-        lut_filename (str): Ścieżka do pliku .CUBE
-        color_space (str): Przestrzeń barwna ('S-Gamut3' lub 'S-Gamut3.Cine')
+        rgb_values (numpy.ndarray): Wartości RGB o kształcie (..., 3)
+        color_spaces (list): Nazwy przestrzeni barwnych z rejestru gamuts
 
     Returns:
-        pandas.DataFrame: Tabela porównawcza
+        numpy.ndarray: Wartości RGB w przestrzeni Rec.709 o kształcie (K, ..., 3)
     """
+    return np.einsum('kij,...j->k...i', stacked_matrices(color_spaces), rgb_values)
 
-    # Wczytanie LUT
-    lut_data = load_cube_file(lut_filename)
+def create_lut_interpolator(lut_data):
+    """
+    Tworzy funkcję interpolującą dla wczytanego pliku LUT.
 
-    # Zdefiniowanie wartości ekspozycji
-    exposure_percentages = list(range(1, 100, 5))  # Od 1% do 99% z krokiem 5%
-    L_values = np.array([p / 100.0 for p in exposure_percentages])
+    Siatka 3D jest budowana tylko raz, więc zwróconą funkcję można
+    wywoływać wielokrotnie bez ponownego przygotowywania danych. Dla LUT
+    typu 'both' 1D LUT jest tablicą wstępną (shaperem) przed 3D LUT.
 
-    # Obliczenie wartości S-Log3
-    V_slog3 = slog3_curve(L_values)  # Wartości między 0 a 1
+    Args:
+        lut_data (dict): Dane LUT zwrócone przez load_cube_file
 
-    # Konwersja S-Log3 na światło liniowe
-    L_linear = inverse_slog3_curve(V_slog3)
+    Returns:
+        callable: Funkcja (r, g, b) -> numpy.ndarray z wartościami (R, G, B)
+    """
+    if lut_data['lut_type'] == '1D':
+        lut_1d = lut_data['lut_1d']
 
-    # Interpolacja wartości LUT - teraz dla R, G, B
-    if lut_data['lut_type'] == '1D' or lut_data['lut_type'] == 'both':
+        def interpolate(input_values_r, input_values_g, input_values_b):
+            return interpolate_1d_lut(lut_1d, input_values_r, input_values_g, input_values_b)
+    elif lut_data['lut_type'] == 'both':
         lut_1d = lut_data['lut_1d']
-        V_lut_rgb = interpolate_1d_lut(lut_1d, V_slog3, V_slog3, V_slog3) # Wejście to wartości S-Log3
+        interpolator = create_3d_interpolator(lut_data['lut_3d'], lut_data['lut_3d_size'])
+
+        def interpolate(input_values_r, input_values_g, input_values_b):
+            shaped = interpolate_1d_lut(lut_1d, input_values_r, input_values_g, input_values_b)
+            return interpolator(np.clip(shaped, 0, 1))
     elif lut_data['lut_type'] == '3D':
-        lut_3d = lut_data['lut_3d']
-        lut_size = lut_data['lut_3d_size']
-        V_lut_rgb = interpolate_3d_lut(lut_3d, lut_size, V_slog3, V_slog3, V_slog3)
+        interpolator = create_3d_interpolator(lut_data['lut_3d'], lut_data['lut_3d_size'])
+
+        def interpolate(input_values_r, input_values_g, input_values_b):
+            return interpolator(np.stack([input_values_r, input_values_g, input_values_b], axis=-1))
     else:
         raise ValueError("Nie można określić typu LUT.")
 
+    return interpolate
+
+def lut_output_to_luminance(lut_rgb, color_space, log_curve=None):
+    """
+    Oblicza luminancję Rec.709 dla wartości wyjściowych LUT zakodowanych logarytmicznie.
+
+    Args:
+        lut_rgb (numpy.ndarray): Wartości wyjściowe LUT o kształcie (..., 3)
+        color_space (str): Przestrzeń barwna ('S-Gamut3' lub 'S-Gamut3.Cine')
+        log_curve (str, optional): Krzywa logarytmiczna (domyślnie krzywa przestrzeni barwnej)
+
+    Returns:
+        numpy.ndarray: Luminancja (0-1) o kształcie (...)
+    """
+    if log_curve is None:
+        log_curve = get_color_space(color_space)['log_curve']
+
     # Konwersja wyjścia LUT z powrotem na światło liniowe
-    V_lut_linear_r = inverse_slog3_curve(V_lut_rgb[:, 0])
-    V_lut_linear_g = inverse_slog3_curve(V_lut_rgb[:, 1])
-    V_lut_linear_b = inverse_slog3_curve(V_lut_rgb[:, 2])
+    return linear_rgb_to_luminance(get_log_curve(log_curve)['decode'](lut_rgb), color_space)
 
-    rgb_values = np.stack([V_lut_linear_r, V_lut_linear_g, V_lut_linear_b], axis=-1)
+def linear_rgb_to_luminance(rgb_values, color_space, luminance_weights=REC709_LUMINANCE_WEIGHTS):
+    """
+    Oblicza luminancję Rec.709 dla liniowych wartości RGB w przestrzeni kamery.
 
-    transformed_rgb = srgb_to_rec709(rgb_values, color_space)
+    Args:
+        rgb_values (numpy.ndarray): Liniowe wartości RGB o kształcie (..., 3)
+        color_space (str): Przestrzeń barwna ('S-Gamut3' lub 'S-Gamut3.Cine')
+        luminance_weights (numpy.ndarray): Współczynniki luminancji (R, G, B)
 
+    Returns:
+        numpy.ndarray: Luminancja (0-1) o kształcie (...)
+    """
+    return rec709_rgb_to_luminance(srgb_to_rec709(rgb_values, color_space), luminance_weights)
+
+def rec709_rgb_to_luminance(transformed_rgb, luminance_weights=REC709_LUMINANCE_WEIGHTS):
+    """
+    Oblicza luminancję dla liniowych wartości RGB w przestrzeni Rec.709.
+
+    Args:
+        transformed_rgb (numpy.ndarray): Liniowe wartości RGB Rec.709 o kształcie (..., 3)
+        luminance_weights (numpy.ndarray): Współczynniki luminancji (R, G, B)
+
+    Returns:
+        numpy.ndarray: Luminancja (0-1) o kształcie (...)
+    """
     # Zastosowanie kodowania gamma (Rec.709 OETF)
     transformed_rgb_gamma = rec709_oetf(transformed_rgb)
 
     # Obliczenie luminancji z przekształconych wartości RGB
-    luminance = (0.2126 * transformed_rgb_gamma[:, 0] +
-                 0.7152 * transformed_rgb_gamma[:, 1] +
-                 0.0722 * transformed_rgb_gamma[:, 2])
-
-    luminance = np.clip(luminance, 0, 1)
-
-    V_slog3_percent = V_slog3 * 100
-    V_rec709_percent = rec709_oetf(L_linear) * 100
-    V_lut_percent = luminance * 100
-
-    data = {
-        'Exposure (%)': exposure_percentages,
-        'S-Log3 (%)': V_slog3_percent,
-        'Rec.709 (%)': V_rec709_percent,
-        'Your LUT (%)': V_lut_percent,
-        'Color Space': [color_space] * len(exposure_percentages)
-    }
-    df = pd.DataFrame(data)
-    return df
+    weights = np.asarray(luminance_weights, dtype=transformed_rgb_gamma.dtype)
+    luminance = np.dot(transformed_rgb_gamma, weights)
+
+    return np.clip(luminance, 0, 1)
+
+def load_cube_file_cached(lut_filename):
+    """
+    Wczytuje plik .CUBE, korzystając z pamięci podręcznej etapów.
+
+    Plik jest parsowany ponownie tylko wtedy, gdy zmieni się jego czas
+    modyfikacji lub rozmiar. Zwrócony słownik jest współdzielony i nie
+    powinien być modyfikowany.
+
+    Args:
+        lut_filename (str): Ścieżka do pliku .CUBE
+
+    Returns:
+        dict: Słownik zawierający dane LUT
+    """
+    path = os.path.abspath(lut_filename)
+    stat = os.stat(path)
+    return stage_cache.get_or_compute(('parse', path, stat.st_mtime_ns, stat.st_size),
+                                      lambda: load_cube_file(path))
+
+def exposure_samples(exposure_percentages, log_curve='S-Log3', samples_key=None):
+    """
+    Etap próbek: wartości logarytmiczne i liniowe dla podanych ekspozycji.
+
+    Args:
+        exposure_percentages (list): Wartości ekspozycji (%)
+        log_curve (str): Krzywa logarytmiczna z rejestru gamuts
+        samples_key (str, optional): Skrót próbek z samples_fingerprint
+
+    Returns:
+        tuple: (wartości logarytmiczne, wartości liniowe)
+    """
+    if samples_key is None:
+        samples_key = samples_fingerprint(exposure_percentages)
+    curve = get_log_curve(log_curve)
+
+    def compute():
+        L_values = np.asarray(exposure_percentages, dtype=np.float64) / 100.0
+
+        # Obliczenie wartości logarytmicznych (np. S-Log3)
+        V_log = curve['encode'](L_values)  # Wartości między 0 a 1
+
+        # Konwersja z powrotem na światło liniowe
+        L_linear = curve['decode'](V_log)
+        return V_log, L_linear
+
+    return stage_cache.get_or_compute(('samples', log_curve, samples_key), compute)
+
+def lut_output_stage(lut_data, exposure_percentages, interpolator=None, lut_key=None, log_curve='S-Log3',
+                     samples_key=None):
+    """
+    Etap LUT: wartości wyjściowe LUT (R, G, B) dla próbek logarytmicznych.
+
+    Args:
+        lut_data (dict): Dane LUT zwrócone przez load_cube_file
+        exposure_percentages (list): Wartości ekspozycji (%)
+        interpolator (callable, optional): Gotowa funkcja z create_lut_interpolator
+        lut_key (str, optional): Skrót LUT z lut_fingerprint
+        log_curve (str): Krzywa logarytmiczna wejścia LUT
+        samples_key (str, optional): Skrót próbek z samples_fingerprint
+
+    Returns:
+        numpy.ndarray: Wartości wyjściowe LUT o kształcie (N, 3)
+    """
+    if lut_key is None:
+        lut_key = lut_fingerprint(lut_data)
+    if samples_key is None:
+        samples_key = samples_fingerprint(exposure_percentages)
+
+    def compute():
+        V_log, _ = exposure_samples(exposure_percentages, log_curve, samples_key)
+        lut_interpolator = interpolator if interpolator is not None else create_lut_interpolator(lut_data)
+        # Interpolacja wartości LUT dla R, G, B (wejście to wartości logarytmiczne)
+        return lut_interpolator(V_log, V_log, V_log)
+
+    return stage_cache.get_or_compute(('lut_output', lut_key, log_curve, samples_key), compute)
+
+def linear_lut_stage(lut_data, exposure_percentages, interpolator=None, lut_key=None, log_curve='S-Log3',
+                     samples_key=None):
+    """
+    Etap linearyzacji: wyjście LUT przeliczone na światło liniowe.
+
+    Args:
+        lut_data (dict): Dane LUT zwrócone przez load_cube_file
+        exposure_percentages (list): Wartości ekspozycji (%)
+        interpolator (callable, optional): Gotowa funkcja z create_lut_interpolator
+        lut_key (str, optional): Skrót LUT z lut_fingerprint
+        log_curve (str): Krzywa logarytmiczna wejścia i wyjścia LUT
+        samples_key (str, optional): Skrót próbek z samples_fingerprint
+
+    Returns:
+        numpy.ndarray: Liniowe wartości RGB o kształcie (N, 3)
+    """
+    if lut_key is None:
+        lut_key = lut_fingerprint(lut_data)
+    if samples_key is None:
+        samples_key = samples_fingerprint(exposure_percentages)
+
+    def compute():
+        V_lut_rgb = lut_output_stage(lut_data, exposure_percentages, interpolator, lut_key, log_curve, samples_key)
+        # Konwersja wyjścia LUT z powrotem na światło liniowe
+        return get_log_curve(log_curve)['decode'](V_lut_rgb)
+
+    return stage_cache.get_or_compute(('linear', lut_key, log_curve, samples_key), compute)
+
+def generate_table(lut_filename, color_space, exposure_percentages=None):
+    """
+    Generuje tabelę porównawczą dla pliku LUT.
+
+    Args:
+        lut_filename (str): Ścieżka do pliku .CUBE
+        color_space (str): Przestrzeń barwna ('S-Gamut3' lub 'S-Gamut3.Cine')
+        exposure_percentages (list, optional): Wartości ekspozycji (%)
+
+    Returns:
+        pandas.DataFrame: Tabela porównawcza
+    """
+
+    # Wczytanie LUT
+    lut_data = load_cube_file_cached(lut_filename)
+    return generate_table_from_lut(lut_data, color_space, exposure_percentages=exposure_percentages)
+
+def generate_table_from_lut(lut_data, color_space, interpolator=None, exposure_percentages=None,
+                            luminance_weights=REC709_LUMINANCE_WEIGHTS, lut_key=None):
+    """
+    Generuje tabelę porównawczą dla wczytanych już danych LUT.
+
+    Wyniki etapów zależnych tylko od LUT i próbek (wyjście LUT, wartości
+    liniowe) są zapamiętywane, więc zmiana przestrzeni barwnej lub
+    współczynników luminancji przelicza jedynie macierz, OETF i luminancję.
+
+    Args:
+        lut_data (dict): Dane LUT zwrócone przez load_cube_file
+        color_space (str): Przestrzeń barwna ('S-Gamut3' lub 'S-Gamut3.Cine')
+        interpolator (callable, optional): Gotowa funkcja z create_lut_interpolator
+        exposure_percentages (list, optional): Wartości ekspozycji (%)
+        luminance_weights (numpy.ndarray): Współczynniki luminancji (R, G, B)
+        lut_key (str, optional): Skrót LUT z lut_fingerprint (liczony, jeśli nie podano)
+
+    Returns:
+        pandas.DataFrame: Tabela porównawcza
+    """
+    return generate_tables_from_lut(lut_data, [color_space], interpolator, exposure_percentages,
+                                    luminance_weights, lut_key)[color_space]
+
+def generate_tables_from_lut(lut_data, color_spaces, interpolator=None, exposure_percentages=None,
+                             luminance_weights=REC709_LUMINANCE_WEIGHTS, lut_key=None):
+    """
+    Generuje tabele porównawcze dla wielu przestrzeni barwnych w jednym przebiegu.
+
+    LUT jest interpolowany raz dla każdej krzywej logarytmicznej, a macierze
+    wszystkich przestrzeni barwnych korzystających z tej krzywej są nakładane
+    jednym wywołaniem einsum.
+
+    Kolumna wartości logarytmicznych nosi nazwę krzywej, np. 'S-Log3 (%)'.
+
+    Args:
+        lut_data (dict): Dane LUT zwrócone przez load_cube_file
+        color_spaces (list): Przestrzenie barwne z rejestru gamuts
+        interpolator (callable, optional): Gotowa funkcja z create_lut_interpolator
+        exposure_percentages (list, optional): Wartości ekspozycji (%)
+        luminance_weights (numpy.ndarray): Współczynniki luminancji (R, G, B)
+        lut_key (str, optional): Skrót LUT z lut_fingerprint (liczony, jeśli nie podano)
+
+    Returns:
+        dict: Słownik {przestrzeń barwna: pandas.DataFrame}
+    """
+    if exposure_percentages is None:
+        exposure_percentages = DEFAULT_EXPOSURE_PERCENTAGES
+    if lut_key is None:
+        lut_key = lut_fingerprint(lut_data)
+    # Skrót próbek liczony raz - klucze etapów mają stały rozmiar niezależnie od liczby próbek
+    samples_key = samples_fingerprint(exposure_percentages)
+
+    # Grupowanie przestrzeni barwnych według krzywej logarytmicznej
+    groups = {}
+    for color_space in color_spaces:
+        groups.setdefault(get_color_space(color_space)['log_curve'], []).append(color_space)
+
+    tables = {}
+    for log_curve, group in groups.items():
+        V_log, L_linear = exposure_samples(exposure_percentages, log_curve, samples_key)
+        rgb_values = linear_lut_stage(lut_data, exposure_percentages, interpolator, lut_key, log_curve, samples_key)
+
+        transformed_rgb = srgb_to_rec709_stacked(rgb_values, group)
+        luminance = rec709_rgb_to_luminance(transformed_rgb, luminance_weights)
+
+        V_log_percent = V_log * 100
+        V_rec709_percent = rec709_oetf(L_linear) * 100
+
+        for color_space, V_lut in zip(group, luminance):
+            data = {
+                'Exposure (%)': list(exposure_percentages),
+                f'{log_curve} (%)': V_log_percent,
+                'Rec.709 (%)': V_rec709_percent,
+                'Your LUT (%)': V_lut * 100,
+                'Color Space': [color_space] * len(exposure_percentages)
+            }
+            tables[color_space] = pd.DataFrame(data)
+
+    return {color_space: tables[color_space] for color_space in color_spaces}
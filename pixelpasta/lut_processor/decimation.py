@@ -0,0 +1,66 @@
+import numpy as np
+
+def lttb_indices(x, y, threshold):
+    """
+    Wybiera punkty krzywej algorytmem Largest-Triangle-Three-Buckets.
+
+    Algorytm zachowuje kształt krzywej, wybierając w każdym przedziale punkt
+    tworzący największy trójkąt z punktem poprzednio wybranym i średnią
+    następnego przedziału. Pierwszy i ostatni punkt są zawsze zachowane.
+    Dla kilku krzywych (y o kształcie (K, N)) pola trójkątów są sumowane,
+    więc wybrany punkt jest wspólny dla wszystkich krzywych.
+
+    Args:
+        x (numpy.ndarray): Wartości osi X (rosnące)
+        y (numpy.ndarray): Wartości osi Y o kształcie (N,) lub (K, N)
+        threshold (int): Docelowa liczba punktów
+
+    Returns:
+        numpy.ndarray: Posortowane indeksy wybranych punktów
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+
+    # Granice przedziałów dla punktów wewnętrznych (bez pierwszego i ostatniego)
+    edges = np.linspace(1, length - 1, threshold - 1).astype(np.intp)
+    indices = np.empty(threshold, dtype=np.intp)
+    indices[0] = 0
+    indices[-1] = length - 1
+
+    selected = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start = end
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else length
+        average_x = x[next_start:next_end].mean()
+        average_y = y[:, next_start:next_end].mean(axis=1, keepdims=True)
+        selected_y = y[:, selected:selected + 1]
+
+        # Podwojone pola trójkątów dla wszystkich punktów przedziału naraz
+        areas = np.abs(
+            (x[selected] - average_x) * (y[:, start:end] - selected_y) -
+            (x[selected] - x[start:end]) * (average_y - selected_y)
+        ).sum(axis=0)
+        selected = start + int(np.argmax(areas))
+        indices[bucket + 1] = selected
+    return indices
+
+def decimate_curves(x, curves, threshold):
+    """
+    Zmniejsza liczbę punktów kilku krzywych o wspólnej osi X.
+
+    Punkty są wybierane algorytmem LTTB wspólnie dla wszystkich krzywych
+    (suma pól trójkątów), więc wynik ma najwyżej threshold punktów.
+
+    Args:
+        x (numpy.ndarray): Wspólne wartości osi X
+        curves (list): Lista tablic wartości Y
+        threshold (int): Maksymalna liczba punktów
+
+    Returns:
+        numpy.ndarray: Posortowane indeksy punktów do zachowania
+    """
+    return lttb_indices(x, np.vstack(curves), threshold)
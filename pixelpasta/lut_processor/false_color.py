@@ -0,0 +1,346 @@
+import json
+import numpy as np
+from .color_analysis import REC709_LUMINANCE_WEIGHTS, rec709_oetf, lut_output_to_luminance
+from .gamuts import get_color_space, get_log_curve
+from .code_values import create_image_transform, effective_bit_depth
+
+# Domyślna paleta pasm IRE (luminancja Rec.709 w %). Wartości spoza pasm są
+# wyświetlane w skali szarości.
+DEFAULT_PALETTE = [
+    {'min': 0.0, 'max': 2.0, 'color': (128, 0, 128), 'label': 'Podcięte cienie'},
+    {'min': 2.0, 'max': 10.0, 'color': (0, 0, 255), 'label': 'Głębokie cienie'},
+    {'min': 38.0, 'max': 42.0, 'color': (0, 200, 0), 'label': 'Średnia szarość 18%'},
+    {'min': 52.0, 'max': 58.0, 'color': (255, 105, 180), 'label': 'Skóra'},
+    {'min': 90.0, 'max': 97.0, 'color': (255, 220, 0), 'label': 'Jasne partie'},
+    {'min': 97.0, 'max': 100.0, 'color': (255, 0, 0), 'label': 'Przepalenia'}
+]
+
+BAND_LOOKUP_SIZE = 4096
+
+# Rozdzielczość tablic krzywych przenoszenia (odwrotna krzywa log, Rec.709 OETF)
+CURVE_LOOKUP_SIZE = 65536
+
+# Najmniejszy rozmiar siatki, w której węzłach liczona jest luminancja po 3D LUT
+LUMINANCE_LATTICE_SIZE = 129
+
+def load_palette(filename):
+    """
+    Wczytuje paletę pasm IRE z pliku JSON.
+
+    Plik zawiera listę obiektów z polami 'min', 'max' (IRE), 'color' ([R, G, B] 0-255)
+    i opcjonalnie 'label'.
+
+    Args:
+        filename (str): Ścieżka do pliku JSON
+
+    Returns:
+        list: Paleta pasm
+    """
+    with open(filename, 'r') as file:
+        bands = json.load(file)
+
+    palette = []
+    for i, band in enumerate(bands):
+        try:
+            palette.append({
+                'min': float(band['min']),
+                'max': float(band['max']),
+                'color': tuple(int(c) for c in band['color']),
+                'label': band.get('label', f"{band['min']}-{band['max']} IRE")
+            })
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Nieprawidłowa definicja pasma nr {i + 1} w palecie")
+        if len(palette[-1]['color']) != 3:
+            raise ValueError(f"Nieprawidłowy kolor pasma nr {i + 1} w palecie")
+    return palette
+
+def build_band_lookup(palette=DEFAULT_PALETTE, size=BAND_LOOKUP_SIZE):
+    """
+    Buduje tablicę kolorów indeksowaną skwantowaną luminancją.
+
+    Args:
+        palette (list): Paleta pasm IRE
+        size (int): Liczba wpisów tablicy (rozdzielczość luminancji)
+
+    Returns:
+        numpy.ndarray: Tablica (size, 3) z kolorami RGB 0-1
+    """
+    ire = np.linspace(0, 100, size)
+    # Poza pasmami - skala szarości odpowiadająca luminancji
+    lookup = np.repeat((ire / 100)[:, None], 3, axis=1).astype(np.float32)
+
+    # Późniejsze pasma nadpisują wcześniejsze w przypadku nakładania się
+    for band in palette:
+        upper = ire <= band['max'] if band['max'] >= 100 else ire < band['max']
+        mask = (ire >= band['min']) & upper
+        lookup[mask] = np.asarray(band['color'], dtype=np.float32) / 255.0
+    return lookup
+
+def build_curve_lookup(curve, size=CURVE_LOOKUP_SIZE):
+    """
+    Tabelaryzuje krzywą przenoszenia w zakresie wejściowym 0-1.
+
+    Args:
+        curve (callable): Funkcja działająca na wartościach 0-1 (np. rec709_oetf)
+        size (int): Liczba wpisów tablicy
+
+    Returns:
+        numpy.ndarray: Tablica float32 o długości size
+    """
+    return curve(np.linspace(0.0, 1.0, size)).astype(np.float32)
+
+def apply_curve_lookup(values, lookup):
+    """
+    Odczytuje wartości krzywej z tablicy zamiast liczyć ją dla każdego piksela.
+
+    Wartości spoza zakresu 0-1 są przycinane, tak jak w samych krzywych.
+
+    Args:
+        values (numpy.ndarray): Wartości wejściowe (0-1)
+        lookup (numpy.ndarray): Tablica zwrócona przez build_curve_lookup
+
+    Returns:
+        numpy.ndarray: Wartości krzywej (float32) o kształcie values
+    """
+    scaled = np.multiply(values, len(lookup) - 1, dtype=np.float32)
+    np.clip(scaled, 0, len(lookup) - 1, out=scaled)
+    scaled += 0.5
+    return lookup.take(scaled.astype(np.int32))
+
+def create_luminance_stage(color_space, luminance_weights=REC709_LUMINANCE_WEIGHTS):
+    """
+    Tworzy funkcję liczącą luminancję Rec.709 dla liniowych klatek w przestrzeni kamery.
+
+    Odpowiada linear_rgb_to_luminance, ale działa w float32, a Rec.709 OETF
+    jest odczytywana z tablicy, więc na piksel przypada tylko mnożenie
+    przez macierz, odczyty z tablicy i suma ważona.
+
+    Args:
+        color_space (str): Przestrzeń barwna z rejestru gamuts
+        luminance_weights (numpy.ndarray): Współczynniki luminancji (R, G, B)
+
+    Returns:
+        callable: Funkcja (liniowe RGB (..., 3)) -> luminancja (0-1) o kształcie (...)
+    """
+    matrix = np.ascontiguousarray(get_color_space(color_space)['matrix'].T, dtype=np.float32)
+    weights = np.asarray(luminance_weights, dtype=np.float32)
+    oetf_lookup = build_curve_lookup(rec709_oetf)
+
+    def stage(linear_rgb):
+        shape = linear_rgb.shape[:-1]
+        rgb = np.asarray(linear_rgb, dtype=np.float32).reshape(-1, 3)
+        rec709_gamma = apply_curve_lookup(rgb @ matrix, oetf_lookup)
+        luminance = rec709_gamma @ weights
+        np.clip(luminance, 0, 1, out=luminance)
+        return luminance.reshape(shape)
+
+    return stage
+
+def luminance_lattice_size(lut_size):
+    """
+    Zwraca rozmiar siatki luminancji (co najmniej LUMINANCE_LATTICE_SIZE).
+
+    Rozmiar jest dobierany tak, aby węzły 3D LUT były też węzłami siatki
+    luminancji, więc w węzłach kostki wynik jest dokładny.
+
+    Args:
+        lut_size (int): Rozmiar 3D LUT
+
+    Returns:
+        int: Rozmiar siatki luminancji
+    """
+    cells = lut_size - 1
+    return cells * -(-(LUMINANCE_LATTICE_SIZE - 1) // cells) + 1
+
+def resample_3d_lut(lut_3d, lut_size, size):
+    """
+    Przelicza 3D LUT na gęstszą siatkę interpolacją trójliniową.
+
+    Interpolacja trójliniowa w węzłach regularnej siatki jest złożeniem
+    interpolacji liniowych wzdłuż osi, więc wystarczą trzy mnożenia przez
+    macierz wag zamiast interpolacji każdego węzła osobno.
+
+    Args:
+        lut_3d (numpy.ndarray): Dane 3D LUT w kolejności pliku .CUBE (R zmienia się najszybciej)
+        lut_size (int): Rozmiar LUT
+        size (int): Rozmiar nowej siatki
+
+    Returns:
+        numpy.ndarray: Dane LUT o kształcie (size^3, 3) w kolejności pliku .CUBE
+    """
+    lut_grid = np.linspace(0.0, 1.0, lut_size)
+    grid = np.linspace(0.0, 1.0, size)
+    # Kolumna k to wagi węzła k starej siatki w węzłach nowej siatki
+    weights = np.stack([np.interp(grid, lut_grid, node) for node in np.eye(lut_size)], axis=1)
+
+    lattice = lut_3d.reshape((lut_size, lut_size, lut_size) + lut_3d.shape[1:])
+    for axis in range(3):
+        lattice = np.moveaxis(np.tensordot(weights, lattice, axes=(1, axis)), 0, axis)
+    return lattice.reshape((size ** 3,) + lut_3d.shape[1:])
+
+def bake_luminance_lut(lut_data, color_space):
+    """
+    Zamienia 3D LUT na siatkę luminancji Rec.709 liczonej po nałożeniu LUT.
+
+    Luminancja jest liczona tak samo jak w generate_table (odwrotna krzywa
+    logarytmiczna, macierz przestrzeni barwnej, Rec.709 OETF) w węzłach
+    gęstej siatki wejść kostki, więc dla piksela pozostaje interpolacja
+    jednej wartości zamiast trzech kanałów, krzywej i macierzy. Shaper 1D
+    LUT typu 'both' pozostaje przed siatką i trafia do tablic kodów.
+
+    Interpolacja luminancji zamiast wartości RGB jest przybliżeniem: różnice
+    względem dokładnego łańcucha pojawiają się głównie w komórkach, w których
+    kanał Rec.709 osiąga przycięcie (0 lub 100%).
+
+    Args:
+        lut_data (dict): Dane LUT ('3D' lub 'both') zwrócone przez load_cube_file
+        color_space (str): Przestrzeń barwna z rejestru gamuts
+
+    Returns:
+        dict: Dane LUT tego samego typu z siatką luminancji (0-1) w 'lut_3d'
+    """
+    if lut_data['lut_type'] != '3D' and lut_data['lut_type'] != 'both':
+        raise ValueError("Siatkę luminancji można zbudować tylko dla LUT z tablicą 3D.")
+
+    size = luminance_lattice_size(lut_data['lut_3d_size'])
+    lut_rgb = resample_3d_lut(lut_data['lut_3d'], lut_data['lut_3d_size'], size)
+    luminance = np.clip(lut_output_to_luminance(lut_rgb, color_space), 0, 1)
+
+    baked = {'lut_type': lut_data['lut_type'], 'lut_3d': luminance, 'lut_3d_size': size}
+    if lut_data['lut_type'] == 'both':
+        baked['lut_1d'] = lut_data['lut_1d']
+    return baked
+
+def luminance_to_band_index(luminance, band_count=BAND_LOOKUP_SIZE):
+    """
+    Zamienia luminancję (0-1) na indeks wpisu tablicy pasm.
+
+    Args:
+        luminance (numpy.ndarray): Luminancja o dowolnym kształcie
+        band_count (int): Liczba wpisów tablicy pasm
+
+    Returns:
+        numpy.ndarray: Indeksy (uint16) o kształcie luminance
+    """
+    return np.rint(luminance * (band_count - 1)).astype(np.uint16)
+
+def luminance_to_false_color(luminance, band_lookup):
+    """
+    Zamienia luminancję (0-1) na kolory fałszywe jednym odczytem z tablicy.
+
+    Args:
+        luminance (numpy.ndarray): Luminancja o dowolnym kształcie
+        band_lookup (numpy.ndarray): Tablica zwrócona przez build_band_lookup
+
+    Returns:
+        numpy.ndarray: Obraz RGB o kształcie (..., 3)
+    """
+    return band_lookup.take(luminance_to_band_index(luminance, len(band_lookup)), axis=0)
+
+def build_band_index_table(luminance_transform, band_count=BAND_LOOKUP_SIZE, planes_per_batch=16):
+    """
+    Buduje tablicę indeksów pasm dla wszystkich 256^3 kolorów 8-bitowych.
+
+    Args:
+        luminance_transform (callable): Funkcja (obraz uint8) -> luminancja (0-1)
+        band_count (int): Liczba wpisów tablicy pasm
+        planes_per_batch (int): Liczba płaszczyzn B liczonych naraz (ogranicza zużycie pamięci)
+
+    Returns:
+        numpy.ndarray: Tablica uint16 o długości 256^3, indeksowana R + 256 * G + 65536 * B
+    """
+    codes = np.arange(256, dtype=np.uint8)
+    table = np.empty((256, 256, 256), dtype=np.uint16)
+    batch = np.empty((planes_per_batch, 256, 256, 3), dtype=np.uint8)
+    batch[..., 0] = codes[None, None, :]
+    batch[..., 1] = codes[None, :, None]
+    for first in range(0, 256, planes_per_batch):
+        batch[..., 2] = codes[first:first + planes_per_batch, None, None]
+        table[first:first + planes_per_batch] = luminance_to_band_index(luminance_transform(batch), band_count)
+    return table.reshape(-1)
+
+def create_false_color_transform(lut_data, color_space, palette=DEFAULT_PALETTE, bit_depth=None):
+    """
+    Tworzy funkcję zamieniającą klatkę na mapę ekspozycji w kolorach fałszywych.
+
+    Luminancja jest liczona po nałożeniu LUT tak samo jak w generate_table
+    (odwrotna krzywa logarytmiczna, macierz przestrzeni barwnej, Rec.709 OETF):
+
+    - klatki 8-bitowe: indeks pasma jest liczony raz dla wszystkich 256^3
+      kolorów (tablica 32 MB budowana przy pierwszej klatce), a piksel
+      wymaga jednego odczytu indeksu i jednego odczytu koloru,
+    - pozostałe klatki z 3D LUT: luminancja jest interpolowana w siatce
+      zbudowanej przez bake_luminance_lut,
+    - pozostałe klatki z 1D LUT: wartości liniowe pochodzą z tablic kodów,
+      a Rec.709 OETF z tablicy krzywej.
+
+    Args:
+        lut_data (dict): Dane LUT zwrócone przez load_cube_file
+        color_space (str): Przestrzeń barwna ('S-Gamut3' lub 'S-Gamut3.Cine')
+        palette (list): Paleta pasm IRE
+        bit_depth (int, optional): Rzeczywista głębia bitowa klatek całkowitych
+
+    Returns:
+        callable: Funkcja (klatka RGB) -> klatka RGB uint8
+    """
+    band_colors = np.rint(build_band_lookup(palette) * 255).astype(np.uint8)
+    decode_lookup = build_curve_lookup(get_log_curve(get_color_space(color_space)['log_curve'])['decode'])
+    linearize = create_image_transform(lut_data, channel_stage=lambda values: apply_curve_lookup(values, decode_lookup),
+                                       bit_depth=bit_depth)
+    luminance_stage = create_luminance_stage(color_space)
+
+    def exact_luminance(frame):
+        return luminance_stage(linearize(frame))
+
+    if lut_data['lut_type'] == '1D':
+        luminance_transform = exact_luminance
+    else:
+        luminance_transform = create_image_transform(bake_luminance_lut(lut_data, color_space), bit_depth=bit_depth)
+    index_tables = {}
+
+    def transform(frame):
+        if frame.dtype == np.uint8 and effective_bit_depth(frame.dtype, bit_depth) in (None, 8):
+            index_table = index_tables.get('uint8')
+            if index_table is None:
+                index_table = index_tables['uint8'] = build_band_index_table(exact_luminance, len(band_colors))
+            flat = frame[..., 2].astype(np.int32) << 16
+            flat |= frame[..., 1].astype(np.int32) << 8
+            flat |= frame[..., 0]
+            return band_colors.take(index_table.take(flat), axis=0)
+        return luminance_to_false_color(luminance_transform(frame), band_colors)
+
+    return transform
+
+def false_color_legend(exposure_percentages, lut_percentages, palette=DEFAULT_PALETTE):
+    """
+    Wyznacza zakresy ekspozycji, które LUT odwzorowuje w poszczególne pasma.
+
+    Args:
+        exposure_percentages (list): Wartości ekspozycji (%)
+        lut_percentages (list): Odpowiadające im wartości 'Your LUT (%)'
+        palette (list): Paleta pasm IRE
+
+    Returns:
+        list: Lista słowników z danymi pasma oraz 'exposure_min' i 'exposure_max'
+              (None, jeśli krzywa LUT nie osiąga pasma)
+    """
+    exposure = np.asarray(exposure_percentages, dtype=float)
+    lut = np.asarray(lut_percentages, dtype=float)
+
+    # Zagęszczenie krzywej, aby wyznaczyć granice pasm między punktami pomiarowymi
+    dense_exposure = np.linspace(exposure.min(), exposure.max(), 1000)
+    dense_lut = np.interp(dense_exposure, exposure, lut)
+
+    legend = []
+    for band in palette:
+        upper = dense_lut <= band['max'] if band['max'] >= 100 else dense_lut < band['max']
+        in_band = dense_exposure[(dense_lut >= band['min']) & upper]
+        legend.append({
+            'label': band['label'],
+            'min': band['min'],
+            'max': band['max'],
+            'color': band['color'],
+            'exposure_min': float(in_band.min()) if in_band.size else None,
+            'exposure_max': float(in_band.max()) if in_band.size else None
+        })
+    return legend
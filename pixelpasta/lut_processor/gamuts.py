@@ -0,0 +1,256 @@
+import numpy as np
+
+# Rejestr przestrzeni barwnych kamer i krzywych logarytmicznych. Macierze do
+# Rec.709 są liczone raz przy imporcie modułu.
+
+WHITE_D65 = (0.3127, 0.3290)
+
+REC709_PRIMARIES = ((0.640, 0.330), (0.300, 0.600), (0.150, 0.060))
+
+def primaries_to_xyz_matrix(primaries, white=WHITE_D65):
+    """
+    Oblicza macierz RGB -> XYZ dla podanych kolorów podstawowych i bieli.
+
+    Args:
+        primaries (tuple): Współrzędne xy kolorów R, G, B
+        white (tuple): Współrzędne xy punktu bieli
+
+    Returns:
+        numpy.ndarray: Macierz 3x3
+    """
+    xy = np.array(primaries, dtype=float)
+    xyz = np.stack([xy[:, 0] / xy[:, 1], np.ones(3), (1 - xy[:, 0] - xy[:, 1]) / xy[:, 1]])
+    white_xyz = np.array([white[0] / white[1], 1.0, (1 - white[0] - white[1]) / white[1]])
+    return xyz * np.linalg.solve(xyz, white_xyz)
+
+def gamut_to_rec709_matrix(primaries, white=WHITE_D65):
+    """
+    Oblicza macierz z przestrzeni kamery do liniowego Rec.709 (biel D65).
+
+    Args:
+        primaries (tuple): Współrzędne xy kolorów R, G, B przestrzeni kamery
+        white (tuple): Współrzędne xy punktu bieli przestrzeni kamery
+
+    Returns:
+        numpy.ndarray: Macierz 3x3
+    """
+    return np.linalg.solve(primaries_to_xyz_matrix(REC709_PRIMARIES), primaries_to_xyz_matrix(primaries, white))
+
+def slog3_curve(L):
+    """
+    Konwertuje wartości liniowe na S-Log3.
+
+    Args:
+        L (numpy.ndarray): Wartości liniowe (0-1)
+
+    Returns:
+        numpy.ndarray: Wartości S-Log3 (0-1)
+    """
+    L = np.clip(L, 0, 1)  # Upewnienie się, że wartości są w zakresie [0, 1]
+    a = 0.432699
+    b = 0.009468
+    c = 0.655
+    d = 0.037584
+    e = 0.01
+    L_threshold = 0.01125000
+
+    V = np.where(
+        L >= L_threshold,
+        a * np.log10(L + b) + c,
+        d * L + e
+    )
+    return V
+
+def inverse_slog3_curve(V):
+    """
+    Konwertuje wartości S-Log3 na liniowe.
+
+    Args:
+        V (numpy.ndarray): Wartości S-Log3 (0-1)
+
+    Returns:
+        numpy.ndarray: Wartości liniowe (0-1)
+    """
+    V = np.clip(V, 0, 1)  # Upewnienie się, że wartości są w zakresie [0, 1]
+    a = 0.432699
+    b = 0.009468
+    c = 0.655
+    d = 0.037584
+    e = 0.01
+    V_threshold = slog3_curve(0.01125)
+
+    L = np.where(
+        V >= V_threshold,
+        np.power(10, (V - c) / a) - b,
+        (V - e) / d
+    )
+    return L
+
+def logc3_curve(L):
+    """
+    Konwertuje wartości liniowe na ARRI LogC3 (EI 800).
+    """
+    L = np.clip(L, 0, 1)
+    cut = 0.010591
+    a = 5.555556
+    b = 0.052272
+    c = 0.247190
+    d = 0.385537
+    e = 5.367655
+    f = 0.092809
+    return np.where(L > cut, c * np.log10(np.maximum(a * L + b, 1e-10)) + d, e * L + f)
+
+def inverse_logc3_curve(V):
+    """
+    Konwertuje wartości ARRI LogC3 (EI 800) na liniowe.
+    """
+    V = np.clip(V, 0, 1)
+    cut = 0.010591
+    a = 5.555556
+    b = 0.052272
+    c = 0.247190
+    d = 0.385537
+    e = 5.367655
+    f = 0.092809
+    return np.where(V > e * cut + f, (np.power(10, (V - d) / c) - b) / a, (V - f) / e)
+
+def vlog_curve(L):
+    """
+    Konwertuje wartości liniowe na Panasonic V-Log.
+    """
+    L = np.clip(L, 0, 1)
+    b = 0.00873
+    c = 0.241514
+    d = 0.598206
+    return np.where(L >= 0.01, c * np.log10(L + b) + d, 5.6 * L + 0.125)
+
+def inverse_vlog_curve(V):
+    """
+    Konwertuje wartości Panasonic V-Log na liniowe.
+    """
+    V = np.clip(V, 0, 1)
+    b = 0.00873
+    c = 0.241514
+    d = 0.598206
+    return np.where(V >= 0.181, np.power(10, (V - d) / c) - b, (V - 0.125) / 5.6)
+
+def log3g10_curve(L):
+    """
+    Konwertuje wartości liniowe na RED Log3G10.
+    """
+    L = np.clip(L, 0, 1)
+    a = 0.224282
+    b = 155.975327
+    c = 0.01
+    g = 15.1927
+    x = L + c
+    return np.where(x >= 0, a * np.log10(np.maximum(x * b + 1, 1e-10)), x * g)
+
+def inverse_log3g10_curve(V):
+    """
+    Konwertuje wartości RED Log3G10 na liniowe.
+    """
+    V = np.clip(V, 0, 1)
+    a = 0.224282
+    b = 155.975327
+    c = 0.01
+    g = 15.1927
+    return np.where(V >= 0, (np.power(10, V / a) - 1) / b, V / g) - c
+
+LOG_CURVES = {}
+
+COLOR_SPACES = {}
+
+# Starsze nazwy przestrzeni barwnych używane w formularzu
+COLOR_SPACE_ALIASES = {
+    'LogC': 'ARRI Wide Gamut 3'
+}
+
+def register_log_curve(name, encode, decode):
+    """
+    Rejestruje krzywą logarytmiczną.
+
+    Args:
+        name (str): Nazwa krzywej
+        encode (callable): Funkcja wartości liniowe -> log
+        decode (callable): Funkcja log -> wartości liniowe
+    """
+    LOG_CURVES[name] = {'name': name, 'encode': encode, 'decode': decode}
+
+def register_color_space(name, matrix, log_curve, label=None):
+    """
+    Rejestruje przestrzeń barwną kamery.
+
+    Args:
+        name (str): Nazwa przestrzeni barwnej
+        matrix (numpy.ndarray): Macierz 3x3 do liniowego Rec.709
+        log_curve (str): Nazwa krzywej logarytmicznej używanej z tą przestrzenią
+        label (str, optional): Nazwa wyświetlana w interfejsie
+    """
+    matrix = np.array(matrix, dtype=float)
+    matrix.setflags(write=False)
+    COLOR_SPACES[name] = {
+        'name': name,
+        'label': label or f'{name}/{log_curve}',
+        'matrix': matrix,
+        'log_curve': log_curve
+    }
+
+def get_color_space(name):
+    """
+    Zwraca wpis rejestru dla przestrzeni barwnej.
+
+    Args:
+        name (str): Nazwa przestrzeni barwnej lub jej alias
+
+    Returns:
+        dict: Wpis z kluczami 'name', 'label', 'matrix' i 'log_curve'
+    """
+    entry = COLOR_SPACES.get(COLOR_SPACE_ALIASES.get(name, name))
+    if entry is None:
+        raise ValueError(f"Nieobsługiwana przestrzeń barwna. Wybierz jedną z: {', '.join(COLOR_SPACES)}")
+    return entry
+
+def get_log_curve(name):
+    """
+    Zwraca wpis rejestru dla krzywej logarytmicznej.
+
+    Args:
+        name (str): Nazwa krzywej
+
+    Returns:
+        dict: Wpis z kluczami 'name', 'encode' i 'decode'
+    """
+    entry = LOG_CURVES.get(name)
+    if entry is None:
+        raise ValueError(f"Nieobsługiwana krzywa logarytmiczna. Wybierz jedną z: {', '.join(LOG_CURVES)}")
+    return entry
+
+def stacked_matrices(color_spaces):
+    """
+    Zwraca macierze podanych przestrzeni barwnych jako tablicę (K, 3, 3).
+    """
+    return np.stack([get_color_space(name)['matrix'] for name in color_spaces])
+
+register_log_curve('S-Log3', slog3_curve, inverse_slog3_curve)
+register_log_curve('LogC3', logc3_curve, inverse_logc3_curve)
+register_log_curve('V-Log', vlog_curve, inverse_vlog_curve)
+register_log_curve('Log3G10', log3g10_curve, inverse_log3g10_curve)
+
+# Macierze Sony pozostają w dotychczasowej postaci, aby nie zmieniać wyników analiz
+register_color_space('S-Gamut3', [
+    [1.6410, -0.3245, -0.3165],
+    [-0.6636, 1.6157, 0.0479],
+    [0.0117, -0.0085, 0.9968]
+], 'S-Log3')
+register_color_space('S-Gamut3.Cine', [
+    [1.5529, -0.2555, -0.2974],
+    [-0.5428, 1.5027, 0.0401],
+    [-0.0026, -0.0186, 1.0212]
+], 'S-Log3')
+register_color_space('ARRI Wide Gamut 3', gamut_to_rec709_matrix(
+    ((0.6840, 0.3130), (0.2210, 0.8480), (0.0861, -0.1020))), 'LogC3')
+register_color_space('V-Gamut', gamut_to_rec709_matrix(
+    ((0.730, 0.280), (0.165, 0.840), (0.100, -0.030))), 'V-Log')
+register_color_space('REDWideGamutRGB', gamut_to_rec709_matrix(
+    ((0.780308, 0.304253), (0.121595, 1.493994), (0.095612, -0.084589))), 'Log3G10')
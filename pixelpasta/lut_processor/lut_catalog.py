@@ -0,0 +1,375 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .cube_parser import load_cube_file
+from .color_analysis import slog3_curve, create_lut_interpolator, lut_output_to_luminance
+
+DEFAULT_CATALOG_PATH = 'lut_catalog.sqlite'
+
+# Tolerancja dla spadków na osi neutralnej uznawanych jeszcze za monotoniczne
+MONOTONIC_TOLERANCE = 1e-6
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS luts (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    title TEXT,
+    lut_type TEXT,
+    lut_1d_size INTEGER,
+    lut_3d_size INTEGER,
+    domain_min TEXT,
+    domain_max TEXT,
+    monotonic INTEGER,
+    neutral_deviation REAL,
+    clip_low REAL,
+    clip_high REAL,
+    middle_gray_output REAL,
+    middle_gray_luminance REAL,
+    error TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS luts_lut_type ON luts (lut_type);
+CREATE INDEX IF NOT EXISTS luts_lut_3d_size ON luts (lut_3d_size);
+'''
+
+_STATISTICS_COLUMNS = (
+    'title', 'lut_type', 'lut_1d_size', 'lut_3d_size', 'domain_min', 'domain_max', 'monotonic',
+    'neutral_deviation', 'clip_low', 'clip_high', 'middle_gray_output', 'middle_gray_luminance'
+)
+
+def neutral_axis(lut_data):
+    """
+    Zwraca wartości wyjściowe LUT dla węzłów osi neutralnej (R = G = B).
+
+    Args:
+        lut_data (dict): Dane LUT zwrócone przez load_cube_file
+
+    Returns:
+        numpy.ndarray: Wartości (N, 3) wzdłuż osi neutralnej
+    """
+    if lut_data['lut_type'] == '1D':
+        return lut_data['lut_1d']
+    if lut_data['lut_type'] == 'both':
+        # Oś neutralna całego łańcucha (shaper 1D i 3D LUT) w węzłach tablicy 1D
+        grid = np.linspace(0.0, 1.0, lut_data['lut_1d_size'])
+        return create_lut_interpolator(lut_data)(grid, grid, grid)
+    lut_size = lut_data['lut_3d_size']
+    diagonal = np.arange(lut_size)
+    # W pliku .CUBE indeks R zmienia się najszybciej
+    return lut_data['lut_3d'][diagonal * (1 + lut_size + lut_size * lut_size)]
+
+def compute_lut_statistics(lut_data):
+    """
+    Oblicza statystyki LUT przechowywane w katalogu.
+
+    Args:
+        lut_data (dict): Dane LUT zwrócone przez load_cube_file
+
+    Returns:
+        dict: Statystyki LUT (kolumny tabeli katalogu)
+    """
+    axis = neutral_axis(lut_data)
+    table = np.concatenate([t for t in (lut_data['lut_1d'], lut_data['lut_3d']) if t is not None])
+
+    # Wyjście LUT dla średniej szarości 18% zakodowanej w S-Log3
+    middle_gray = slog3_curve(np.array([0.18]))
+    middle_gray_rgb = create_lut_interpolator(lut_data)(middle_gray, middle_gray, middle_gray)
+
+    return {
+        'title': lut_data['title'].strip('"') if lut_data['title'] else None,
+        'lut_type': lut_data['lut_type'],
+        'lut_1d_size': lut_data['lut_1d_size'],
+        'lut_3d_size': lut_data['lut_3d_size'],
+        'domain_min': json.dumps([float(v) for v in lut_data['domain_min']]),
+        'domain_max': json.dumps([float(v) for v in lut_data['domain_max']]),
+        'monotonic': int(bool(np.all(np.diff(axis, axis=0) >= -MONOTONIC_TOLERANCE))),
+        'neutral_deviation': float(np.max(np.ptp(axis, axis=1))),
+        # Udział wartości poza zakresem [0, 1], które zostaną przycięte na wyjściu
+        'clip_low': float(np.mean(table < 0.0)),
+        'clip_high': float(np.mean(table > 1.0)),
+        'middle_gray_output': float(np.mean(middle_gray_rgb)),
+        'middle_gray_luminance': float(lut_output_to_luminance(middle_gray_rgb, 'S-Gamut3')[0] * 100)
+    }
+
+def index_file(path, known_hash=None):
+    """
+    Wczytuje plik .CUBE i zwraca jego skrót oraz statystyki.
+
+    Args:
+        path (str): Ścieżka do pliku .CUBE
+        known_hash (str, optional): Skrót zapisany w katalogu; jeśli się zgadza,
+            plik nie jest ponownie analizowany
+
+    Returns:
+        tuple: (skrót SHA-1, słownik statystyk lub None, komunikat błędu lub None);
+            skrót jest None, jeśli pliku nie udało się odczytać
+    """
+    try:
+        with open(path, 'rb') as file:
+            content = file.read()
+    except OSError as e:
+        # Plik usunięty lub niedostępny po przeszukaniu katalogów
+        return None, None, str(e)
+    file_hash = hashlib.sha1(content).hexdigest()
+    if file_hash == known_hash:
+        return file_hash, None, None
+    try:
+        statistics = compute_lut_statistics(load_cube_file(path))
+    except (ValueError, TypeError, OSError) as e:
+        return file_hash, {}, str(e)
+    return file_hash, statistics, None
+
+def find_cube_files(directories):
+    """
+    Zwraca słownik {ścieżka: (mtime_ns, rozmiar)} dla plików .CUBE w katalogach.
+    """
+    files = {}
+    for directory in directories:
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                if not filename.lower().endswith('.cube'):
+                    continue
+                path = os.path.abspath(os.path.join(root, filename))
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+class LutCatalog:
+    """
+    Katalog metadanych LUT przechowywany w lokalnej bazie SQLite.
+
+    Wpisy są kluczowane ścieżką, czasem modyfikacji i skrótem zawartości,
+    więc odświeżanie ponownie analizuje tylko zmienione pliki.
+    """
+
+    def __init__(self, db_path=DEFAULT_CATALOG_PATH):
+        """
+        Args:
+            db_path (str): Ścieżka do pliku bazy SQLite
+        """
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def update(self, directories, workers=1):
+        """
+        Odświeża katalog dla podanych katalogów z plikami .CUBE.
+
+        Pliki o niezmienionym czasie modyfikacji i rozmiarze są pomijane bez
+        otwierania, a pliki o niezmienionym skrócie nie są ponownie analizowane.
+
+        Args:
+            directories (list): Katalogi do przeszukania
+            workers (int): Liczba procesów analizujących zmienione pliki
+
+        Returns:
+            dict: Liczba plików dodanych, zaktualizowanych, niezmienionych, usuniętych
+                i pominiętych (nieczytelnych)
+        """
+        roots = [os.path.join(os.path.abspath(d), '') for d in directories]
+        files = find_cube_files(directories)
+
+        known = {}
+        for row in self.connection.execute('SELECT path, mtime_ns, size, hash FROM luts'):
+            if any(row['path'].startswith(root) for root in roots):
+                known[row['path']] = (row['mtime_ns'], row['size'], row['hash'])
+
+        changed = [path for path, stat in files.items() if known.get(path, (None, None))[:2] != stat]
+        removed = [path for path in known if path not in files]
+
+        known_hashes = [known[path][2] if path in known else None for path in changed]
+        if workers > 1 and len(changed) > 1:
+            with ProcessPoolExecutor(workers) as executor:
+                results = list(executor.map(index_file, changed, known_hashes, chunksize=16))
+        else:
+            results = list(map(index_file, changed, known_hashes))
+
+        now = time.time()
+        rows = []
+        touched = []
+        skipped = []
+        for path, (file_hash, statistics, error) in zip(changed, results):
+            mtime_ns, size = files[path]
+            if file_hash is None:
+                # Nieczytelny plik jest pomijany (i usuwany z katalogu) - zostanie sprawdzony przy kolejnym odświeżeniu
+                skipped.append(path)
+                continue
+            if statistics is None and error is None:
+                # Zmieniony tylko czas modyfikacji - statystyki pozostają aktualne
+                touched.append((mtime_ns, size, now, path))
+                continue
+            rows.append((path, mtime_ns, size, file_hash, error, now) +
+                        tuple(statistics.get(column) for column in _STATISTICS_COLUMNS))
+
+        with self.connection:
+            self.connection.executemany('DELETE FROM luts WHERE path = ?', [(path,) for path in removed + skipped])
+            self.connection.executemany(
+                'UPDATE luts SET mtime_ns = ?, size = ?, indexed_at = ? WHERE path = ?', touched)
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO luts (path, mtime_ns, size, hash, error, indexed_at, {}) '
+                'VALUES ({})'.format(', '.join(_STATISTICS_COLUMNS), ', '.join('?' * (6 + len(_STATISTICS_COLUMNS)))),
+                rows)
+
+        indexed = [path for path in changed if path not in skipped]
+        return {
+            'added': sum(1 for path in indexed if path not in known),
+            'updated': sum(1 for path in indexed if path in known),
+            'unchanged': len(files) - len(changed),
+            'removed': len(removed),
+            'skipped': len(skipped)
+        }
+
+    def query(self, lut_type=None, lut_size=None, title=None, monotonic=None, max_neutral_deviation=None,
+              max_clipping=None, middle_gray_min=None, middle_gray_max=None, domain_min=None, domain_max=None,
+              include_errors=False):
+        """
+        Wyszukuje LUT w katalogu według statystyk.
+
+        Args:
+            lut_type (str, optional): Typ LUT ('1D', '3D' lub 'both')
+            lut_size (int, optional): Rozmiar LUT 1D lub 3D
+            title (str, optional): Fragment tytułu (bez rozróżniania wielkości liter)
+            monotonic (bool, optional): Czy oś neutralna ma być monotoniczna
+            max_neutral_deviation (float, optional): Maksymalne odchylenie od osi neutralnej
+            max_clipping (float, optional): Maksymalny udział przyciętych wartości (0-1)
+            middle_gray_min (float, optional): Minimalna luminancja średniej szarości (%)
+            middle_gray_max (float, optional): Maksymalna luminancja średniej szarości (%)
+            domain_min (list, optional): Wymagane DOMAIN_MIN
+            domain_max (list, optional): Wymagane DOMAIN_MAX
+            include_errors (bool): Czy zwracać pliki, których nie udało się wczytać
+
+        Returns:
+            list: Lista słowników z wpisami katalogu
+        """
+        conditions = []
+        parameters = []
+
+        def add(condition, *values):
+            conditions.append(condition)
+            parameters.extend(values)
+
+        if not include_errors:
+            add('error IS NULL')
+        if lut_type is not None:
+            add('lut_type = ?', lut_type)
+        if lut_size is not None:
+            add('(lut_1d_size = ? OR lut_3d_size = ?)', lut_size, lut_size)
+        if title is not None:
+            add('title LIKE ?', f'%{title}%')
+        if monotonic is not None:
+            add('monotonic = ?', int(monotonic))
+        if max_neutral_deviation is not None:
+            add('neutral_deviation <= ?', max_neutral_deviation)
+        if max_clipping is not None:
+            add('clip_low + clip_high <= ?', max_clipping)
+        if middle_gray_min is not None:
+            add('middle_gray_luminance >= ?', middle_gray_min)
+        if middle_gray_max is not None:
+            add('middle_gray_luminance <= ?', middle_gray_max)
+        if domain_min is not None:
+            add('domain_min = ?', json.dumps([float(v) for v in domain_min]))
+        if domain_max is not None:
+            add('domain_max = ?', json.dumps([float(v) for v in domain_max]))
+
+        sql = 'SELECT * FROM luts'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY path'
+
+        results = []
+        for row in self.connection.execute(sql, parameters):
+            entry = dict(row)
+            for key in ('domain_min', 'domain_max'):
+                if entry[key] is not None:
+                    entry[key] = json.loads(entry[key])
+            if entry['monotonic'] is not None:
+                entry['monotonic'] = bool(entry['monotonic'])
+            results.append(entry)
+        return results
+
+def format_entry(entry):
+    """
+    Formatuje wpis katalogu do wyświetlenia w konsoli.
+    """
+    if entry['error']:
+        return f"{entry['path']}  BŁĄD: {entry['error']}"
+    size = entry['lut_3d_size'] or entry['lut_1d_size']
+    return (f"{entry['path']}  {entry['lut_type']} {size}  "
+            f"monotoniczny={'tak' if entry['monotonic'] else 'nie'}  "
+            f"odchylenie={entry['neutral_deviation']:.4f}  "
+            f"przycięcie={100 * (entry['clip_low'] + entry['clip_high']):.1f}%  "
+            f"szarość 18%={entry['middle_gray_luminance']:.1f}%  "
+            f"{entry['title'] or ''}").rstrip()
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Katalog metadanych plików LUT.')
+    parser.add_argument('--db', default=DEFAULT_CATALOG_PATH, help='Ścieżka do bazy SQLite katalogu')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = subparsers.add_parser('index', help='Odświeżenie katalogu')
+    index_parser.add_argument('directories', nargs='+', help='Katalogi z plikami .CUBE')
+    index_parser.add_argument('--workers', type=int, default=1, help='Liczba procesów analizujących pliki')
+
+    query_parser = subparsers.add_parser('query', help='Wyszukiwanie LUT')
+    query_parser.add_argument('--type', dest='lut_type', choices=['1D', '3D', 'both'], help='Typ LUT')
+    query_parser.add_argument('--size', dest='lut_size', type=int, help='Rozmiar LUT')
+    query_parser.add_argument('--title', help='Fragment tytułu')
+    query_parser.add_argument('--monotonic', action='store_true', default=None, help='Tylko monotoniczne')
+    query_parser.add_argument('--non-monotonic', dest='monotonic', action='store_false', help='Tylko niemonotoniczne')
+    query_parser.add_argument('--max-neutral-deviation', type=float, help='Maksymalne odchylenie od osi neutralnej')
+    query_parser.add_argument('--max-clipping', type=float, help='Maksymalny udział przyciętych wartości (0-1)')
+    query_parser.add_argument('--middle-gray-min', type=float, help='Minimalna luminancja szarości 18%% (%%)')
+    query_parser.add_argument('--middle-gray-max', type=float, help='Maksymalna luminancja szarości 18%% (%%)')
+    query_parser.add_argument('--domain-min', type=float, nargs=3, help='Wymagane DOMAIN_MIN')
+    query_parser.add_argument('--domain-max', type=float, nargs=3, help='Wymagane DOMAIN_MAX')
+    query_parser.add_argument('--include-errors', action='store_true', help='Pokaż także błędne pliki')
+    query_parser.add_argument('--json', action='store_true', help='Wynik w formacie JSON')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    with LutCatalog(args.db) as catalog:
+        if args.command == 'index':
+            start = time.perf_counter()
+            summary = catalog.update(args.directories, workers=args.workers)
+            elapsed = time.perf_counter() - start
+            print(f"Dodano: {summary['added']}, zaktualizowano: {summary['updated']}, "
+                  f"bez zmian: {summary['unchanged']}, usunięto: {summary['removed']}, "
+                  f"pominięto: {summary['skipped']} ({elapsed:.2f} s)")
+            return 0
+
+        filters = vars(args).copy()
+        for key in ('db', 'command', 'json'):
+            filters.pop(key)
+        results = catalog.query(**filters)
+        if args.json:
+            print(json.dumps(results, ensure_ascii=False, indent=2))
+        else:
+            for entry in results:
+                print(format_entry(entry))
+        return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
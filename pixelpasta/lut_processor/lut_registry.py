@@ -0,0 +1,156 @@
+import os
+import threading
+from .cube_parser import load_cube_file
+from .color_analysis import create_lut_interpolator
+from .stage_cache import lut_fingerprint
+
+class LutRegistry:
+    """
+    Rejestr plików .CUBE wczytanych z katalogu biblioteki LUT.
+
+    Każdy plik jest parsowany tylko raz, a gotowe dane i interpolatory są
+    przechowywane w pamięci. Wątek odpytujący sprawdza czasy modyfikacji
+    plików i przeładowuje zmienione pliki, podmieniając cały słownik wpisów
+    jednym przypisaniem, dzięki czemu trwające żądania widzą spójny stan.
+    """
+
+    def __init__(self, directory, poll_interval=2.0):
+        """
+        Args:
+            directory (str): Katalog z plikami .CUBE
+            poll_interval (float): Odstęp w sekundach między sprawdzeniami zmian
+        """
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._entries = {}
+        self._errors = {}
+        self._reload_lock = threading.Lock()  # Tylko jeden wątek może przeładowywać rejestr
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _scan_directory(self):
+        """
+        Zwraca słownik {nazwa: (ścieżka, mtime)} dla plików .CUBE w katalogu.
+        """
+        files = {}
+        if not os.path.isdir(self.directory):
+            return files
+        for filename in os.listdir(self.directory):
+            if not filename.lower().endswith('.cube'):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue  # Plik usunięty w trakcie skanowania
+            files[os.path.splitext(filename)[0]] = (path, mtime)
+        return files
+
+    @staticmethod
+    def _load_entry(name, path, mtime):
+        lut_data = load_cube_file(path)
+        return {
+            'name': name,
+            'filename': os.path.basename(path),
+            'path': path,
+            'mtime': mtime,
+            'lut_data': lut_data,
+            'interpolator': create_lut_interpolator(lut_data),
+            'lut_key': lut_fingerprint(lut_data)
+        }
+
+    def refresh(self):
+        """
+        Wczytuje nowe i zmienione pliki oraz usuwa wpisy dla usuniętych plików.
+
+        Returns:
+            bool: True, jeśli zawartość rejestru uległa zmianie
+        """
+        with self._reload_lock:
+            current = self._entries
+            files = self._scan_directory()
+            entries = {}
+            errors = {}
+            changed = set(current) != set(files)
+
+            for name, (path, mtime) in files.items():
+                entry = current.get(name)
+                if entry is not None and entry['path'] == path and entry['mtime'] == mtime:
+                    entries[name] = entry
+                    continue
+                try:
+                    entries[name] = self._load_entry(name, path, mtime)
+                except (OSError, ValueError) as e:
+                    # Uszkodzony plik nie może usunąć poprzedniej, poprawnej wersji
+                    errors[name] = str(e)
+                    if entry is not None:
+                        entries[name] = entry
+                    continue
+                changed = True
+
+            # Atomowa podmiana - czytelnicy zawsze widzą kompletny słownik
+            self._entries = entries
+            self._errors = errors
+            return changed
+
+    def get(self, name):
+        """
+        Zwraca wpis rejestru dla podanej nazwy LUT lub None.
+        """
+        return self._entries.get(name)
+
+    def find_by_key(self, lut_key):
+        """
+        Zwraca wpis rejestru o podanym skrócie zawartości LUT lub None.
+        """
+        for entry in self._entries.values():
+            if entry['lut_key'] == lut_key:
+                return entry
+        return None
+
+    def list_luts(self):
+        """
+        Zwraca listę informacji o dostępnych plikach LUT, posortowaną po nazwie.
+        """
+        entries = self._entries
+        return [
+            {
+                'name': name,
+                'filename': entry['filename'],
+                'title': entry['lut_data']['title'],
+                'lut_type': entry['lut_data']['lut_type'],
+                'lut_1d_size': entry['lut_data']['lut_1d_size'],
+                'lut_3d_size': entry['lut_data']['lut_3d_size']
+            }
+            for name, entry in sorted(entries.items())
+        ]
+
+    @property
+    def errors(self):
+        """
+        Słownik {nazwa: komunikat} dla plików, których nie udało się wczytać.
+        """
+        return dict(self._errors)
+
+    def _poll(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self.refresh()
+
+    def start(self):
+        """
+        Wczytuje bibliotekę i uruchamia wątek odpytujący o zmiany w plikach.
+        """
+        self.refresh()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._poll, name='lut-registry-poll', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Zatrzymuje wątek odpytujący.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,317 @@
+import argparse
+import glob
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from .cube_parser import load_cube_file
+from .code_values import create_image_transform
+from .false_color import DEFAULT_PALETTE, load_palette, create_false_color_transform
+
+try:
+    import tifffile
+except ImportError:  # Opcjonalna zależność: pip install pixelpasta[tiff]
+    tifffile = None
+
+IMAGE_EXTENSIONS = ('.png', '.tif', '.tiff', '.jpg', '.jpeg', '.bmp')
+TIFF_EXTENSIONS = ('.tif', '.tiff')
+
+_END_OF_SEQUENCE = None  # Znacznik końca sekwencji w kolejkach
+
+# Tryby Pillow z 16-bitowymi wartościami kodu (obrazy jednokanałowe)
+SIXTEEN_BIT_MODES = ('I;16', 'I;16B', 'I;16L', 'I;16N', 'I')
+
+def quantize_to_uint8(values):
+    """
+    Kwantyzuje wartości 0-1 do 8-bitowych wartości kodu.
+    """
+    return np.rint(np.clip(values, 0, 1) * 255.0).astype(np.uint8)
+
+def read_tiff_frame(path):
+    """
+    Wczytuje pierwszą stronę pliku TIFF przez tifffile z zachowaniem głębi bitowej.
+
+    Args:
+        path (str): Ścieżka do pliku TIFF
+
+    Returns:
+        numpy.ndarray: Obraz RGB (uint8 lub uint16) albo None, jeśli format
+        próbek nie jest obsługiwany i należy użyć Pillow
+    """
+    with tifffile.TiffFile(path) as tif:
+        page = tif.pages[0]
+        frame = page.asarray()
+        axes = page.axes
+    if frame.dtype not in (np.uint8, np.uint16):
+        return None
+    if 'S' in axes:
+        # Próbki zapisane jako osobne płaszczyzny (SYX) przenosimy na koniec
+        frame = np.moveaxis(frame, axes.index('S'), -1)
+    if frame.ndim == 2:
+        return np.repeat(frame[..., None], 3, axis=-1)
+    if frame.ndim != 3 or frame.shape[-1] < 3:
+        return None
+    return np.ascontiguousarray(frame[..., :3])
+
+def decode_frame(path):
+    """
+    Wczytuje klatkę z dysku jako tablicę RGB.
+
+    Obrazy 16-bitowe są zwracane jako uint16, pozostałe jako uint8. Konwersja
+    Pillow do 'RGB' obcina wartości 16-bitowe do 8 bitów, więc 16-bitowe
+    obrazy jednokanałowe są czytane bezpośrednio (kanał powielony na R, G, B),
+    a pliki TIFF przez tifffile, jeśli jest zainstalowany. Bez tifffile
+    48-bitowy TIFF RGB powoduje błąd zamiast cichej utraty precyzji.
+
+    Args:
+        path (str): Ścieżka do pliku obrazu
+
+    Returns:
+        tuple: (numpy.ndarray obrazu, czas dekodowania w sekundach)
+    """
+    start = time.perf_counter()
+    if tifffile is not None and path.lower().endswith(TIFF_EXTENSIONS):
+        frame = read_tiff_frame(path)
+        if frame is not None:
+            return frame, time.perf_counter() - start
+    with Image.open(path) as img:
+        if img.mode in SIXTEEN_BIT_MODES:
+            channel = np.asarray(img)
+            if channel.dtype != np.uint16:
+                channel = np.clip(channel, 0, 65535).astype(np.uint16)
+            frame = np.repeat(channel[..., None], 3, axis=-1)
+        else:
+            if tifffile is None and img.format == 'TIFF':
+                bits = max(np.atleast_1d(img.tag_v2.get(258, 8)))
+                if bits == 16:
+                    raise ValueError(f"Klatka {path} ma 16 bitów na kanał; zainstaluj tifffile "
+                                     "(pip install pixelpasta[tiff]), aby wczytać ją bez utraty precyzji")
+            frame = np.asarray(img.convert('RGB'))
+    return frame, time.perf_counter() - start
+
+def encode_frame(frame, path):
+    """
+    Zapisuje klatkę RGB na dysk jako obraz 8-bitowy.
+
+    Args:
+        frame (numpy.ndarray): Obraz RGB (uint8 lub wartości 0-1)
+        path (str): Ścieżka do pliku wyjściowego
+
+    Returns:
+        float: Czas kodowania w sekundach
+    """
+    start = time.perf_counter()
+    if frame.dtype != np.uint8:
+        frame = quantize_to_uint8(frame)
+    Image.fromarray(frame, 'RGB').save(path)
+    return time.perf_counter() - start
+
+def collect_frames(inputs):
+    """
+    Zwraca posortowaną listę klatek z podanych plików, katalogów lub wzorców glob.
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(
+                os.path.join(item, name) for name in os.listdir(item)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            paths.extend(glob.glob(item))
+    return sorted(paths)
+
+def process_sequence(frame_paths, output_dir, lut_data, read_workers=4, write_workers=4, queue_size=8,
+                     transform=None, output_extension=None, bit_depth=None):
+    """
+    Przetwarza sekwencję klatek przez LUT w potoku odczyt -> obliczenia -> zapis.
+
+    Dekodowanie i kodowanie działają w pulach wątków, a etapy są połączone
+    kolejkami o ograniczonym rozmiarze, więc w pamięci znajduje się najwyżej
+    kilka klatek naraz niezależnie od długości sekwencji.
+
+    Args:
+        frame_paths (list): Ścieżki do klatek wejściowych, w kolejności
+        output_dir (str): Katalog na klatki wyjściowe
+        lut_data (dict): Dane LUT zwrócone przez load_cube_file
+        read_workers (int): Liczba wątków dekodujących
+        write_workers (int): Liczba wątków kodujących
+        queue_size (int): Maksymalna liczba klatek oczekujących między etapami
+        transform (callable, optional): Funkcja (klatka) -> klatka zastępująca samo nałożenie LUT
+        output_extension (str, optional): Rozszerzenie plików wyjściowych (domyślnie jak wejście)
+        bit_depth (int, optional): Rzeczywista głębia bitowa klatek 16-bitowych (np. 10 lub 12)
+
+    Returns:
+        dict: Statystyki przetwarzania (liczba klatek, klatki/s, wykorzystanie etapów)
+    """
+    if transform is None:
+        # Kwantyzacja do 8 bitów wchodzi do tablic kodów razem z LUT
+        transform = create_image_transform(lut_data, channel_stage=quantize_to_uint8, bit_depth=bit_depth)
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    read_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    stats = {'decode_time': 0.0, 'compute_time': 0.0, 'encode_time': 0.0, 'frames': 0}
+    errors = []
+    abort = threading.Event()
+
+    def output_path(path):
+        name = os.path.basename(path)
+        if output_extension:
+            name = os.path.splitext(name)[0] + '.' + output_extension.lstrip('.')
+        return os.path.join(output_dir, name)
+
+    def put(target_queue, item):
+        # Blokujące put przerywane w razie błędu w innym etapie
+        while not abort.is_set():
+            try:
+                target_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(source_queue):
+        # Blokujące get przerywane w razie błędu w innym etapie
+        while not abort.is_set():
+            try:
+                return source_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END_OF_SEQUENCE
+
+    def reader(read_pool):
+        for path in frame_paths:
+            if not put(read_queue, (path, read_pool.submit(decode_frame, path))):
+                return
+        put(read_queue, _END_OF_SEQUENCE)
+
+    def writer():
+        while True:
+            item = get(write_queue)
+            if item is _END_OF_SEQUENCE:
+                return
+            try:
+                stats['encode_time'] += item.result()
+                stats['frames'] += 1
+            except Exception as e:
+                errors.append(e)
+                abort.set()
+                return
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(read_workers, thread_name_prefix='decode') as read_pool, \
+            ThreadPoolExecutor(write_workers, thread_name_prefix='encode') as write_pool:
+        reader_thread = threading.Thread(target=reader, args=(read_pool,), daemon=True)
+        writer_thread = threading.Thread(target=writer, daemon=True)
+        reader_thread.start()
+        writer_thread.start()
+
+        # Etap obliczeń działa w bieżącym wątku
+        try:
+            while True:
+                item = get(read_queue)
+                if item is _END_OF_SEQUENCE:
+                    break
+                path, future = item
+                frame, decode_time = future.result()
+                stats['decode_time'] += decode_time
+
+                compute_start = time.perf_counter()
+                output = transform(frame)
+                stats['compute_time'] += time.perf_counter() - compute_start
+
+                if not put(write_queue, write_pool.submit(encode_frame, output, output_path(path))):
+                    break
+        except Exception as e:
+            errors.append(e)
+            abort.set()
+        finally:
+            put(write_queue, _END_OF_SEQUENCE)
+            reader_thread.join()
+            writer_thread.join()
+
+    if errors:
+        raise errors[0]
+
+    elapsed = time.perf_counter() - start
+    frames = stats['frames']
+    return {
+        'frames': frames,
+        'elapsed': elapsed,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+        # Wykorzystanie = czas pracy etapu / (czas całkowity * liczba wątków etapu)
+        'decode_utilization': stats['decode_time'] / (elapsed * read_workers) if elapsed > 0 else 0.0,
+        'compute_utilization': stats['compute_time'] / elapsed if elapsed > 0 else 0.0,
+        'encode_utilization': stats['encode_time'] / (elapsed * write_workers) if elapsed > 0 else 0.0
+    }
+
+def format_stats(stats):
+    """
+    Formatuje statystyki potoku do wyświetlenia w konsoli.
+    """
+    stages = {
+        'dekodowanie': stats['decode_utilization'],
+        'obliczenia': stats['compute_utilization'],
+        'kodowanie': stats['encode_utilization']
+    }
+    bottleneck = max(stages, key=stages.get)
+    lines = [
+        f"Klatki: {stats['frames']}",
+        f"Czas: {stats['elapsed']:.2f} s",
+        f"Wydajność: {stats['fps']:.2f} klatek/s"
+    ]
+    lines.extend(f"Wykorzystanie ({name}): {value * 100:.1f}%" for name, value in stages.items())
+    lines.append(f"Wąskie gardło: {bottleneck}")
+    return '\n'.join(lines)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Nakładanie LUT na sekwencję klatek.')
+    parser.add_argument('lut', help='Plik .CUBE')
+    parser.add_argument('inputs', nargs='+', help='Klatki wejściowe: pliki, katalogi lub wzorce glob')
+    parser.add_argument('-o', '--output-dir', required=True, help='Katalog na klatki wyjściowe')
+    parser.add_argument('--read-workers', type=int, default=4, help='Liczba wątków dekodujących')
+    parser.add_argument('--write-workers', type=int, default=4, help='Liczba wątków kodujących')
+    parser.add_argument('--queue-size', type=int, default=8, help='Maksymalna liczba klatek między etapami')
+    parser.add_argument('--format', dest='output_extension', help='Rozszerzenie plików wyjściowych, np. png')
+    parser.add_argument('--false-color', action='store_true', help='Zapis mapy ekspozycji w kolorach fałszywych')
+    parser.add_argument('--color-space', default='S-Gamut3', help='Przestrzeń barwna dla trybu kolorów fałszywych')
+    parser.add_argument('--palette', help='Plik JSON z paletą pasm IRE dla trybu kolorów fałszywych')
+    parser.add_argument('--bit-depth', type=int,
+                        help='Rzeczywista głębia bitowa klatek 16-bitowych, np. 10 lub 12 (domyślnie 16)')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    frame_paths = collect_frames(args.inputs)
+    if not frame_paths:
+        print("Nie znaleziono klatek wejściowych.", file=sys.stderr)
+        return 1
+
+    lut_data = load_cube_file(args.lut)
+
+    transform = None
+    if args.false_color:
+        palette = load_palette(args.palette) if args.palette else DEFAULT_PALETTE
+        transform = create_false_color_transform(lut_data, args.color_space, palette, bit_depth=args.bit_depth)
+
+    stats = process_sequence(
+        frame_paths, args.output_dir, lut_data,
+        read_workers=args.read_workers,
+        write_workers=args.write_workers,
+        queue_size=args.queue_size,
+        transform=transform,
+        output_extension=args.output_extension,
+        bit_depth=args.bit_depth
+    )
+    print(format_stats(stats))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+class StageCache:
+    """
+    Pamięć podręczna LRU dla pośrednich wyników etapów analizy.
+
+    Klucz zawiera nazwę etapu oraz wszystkie parametry, od których zależy
+    wynik, więc zmiana parametru późniejszego etapu nie unieważnia wyników
+    etapów wcześniejszych. Zapisane tablice są tylko do odczytu.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=None):
+        """
+        Args:
+            max_entries (int): Maksymalna liczba przechowywanych wyników
+            max_bytes (int, optional): Maksymalny łączny rozmiar tablic w wynikach
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _arrays(value):
+        """
+        Zwraca tablice zawarte w wyniku (sam wynik, krotka lub wartości słownika).
+        """
+        if isinstance(value, dict):
+            items = value.values()
+        elif isinstance(value, tuple):
+            items = value
+        else:
+            items = (value,)
+        return [item for item in items if isinstance(item, np.ndarray)]
+
+    def get_or_compute(self, key, compute):
+        """
+        Zwraca zapamiętany wynik dla klucza lub oblicza go funkcją compute.
+
+        Args:
+            key (tuple): Klucz etapu
+            compute (callable): Funkcja bez argumentów obliczająca wynik
+
+        Returns:
+            object: Wynik etapu
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Obliczenie poza blokadą, aby nie wstrzymywać innych wątków
+        value = compute()
+        arrays = self._arrays(value)
+        for array in arrays:
+            array.setflags(write=False)
+        size = sum(array.nbytes for array in arrays)
+
+        with self._lock:
+            self.total_bytes += size - self._sizes.get(key, 0)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._entries.move_to_end(key)
+            # Najnowszy wynik jest zawsze zachowany, nawet jeśli sam przekracza limit
+            while len(self._entries) > self.max_entries or (
+                    self.max_bytes is not None and self.total_bytes > self.max_bytes and len(self._entries) > 1):
+                evicted, _ = self._entries.popitem(last=False)
+                self.total_bytes -= self._sizes.pop(evicted)
+        return value
+
+    def get(self, key, default=None):
+        """
+        Zwraca zapamiętany wynik dla klucza bez obliczania go.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def clear(self):
+        """
+        Usuwa wszystkie zapamiętane wyniki.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+def lut_fingerprint(lut_data):
+    """
+    Oblicza skrót zawartości LUT, używany jako klucz pamięci podręcznej.
+
+    Args:
+        lut_data (dict): Dane LUT zwrócone przez load_cube_file
+
+    Returns:
+        str: Skrót szesnastkowy
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((lut_data['lut_type'], lut_data['lut_1d_size'], lut_data['lut_3d_size'])).encode('utf-8'))
+    for key in ('lut_1d', 'lut_3d'):
+        values = lut_data[key]
+        if values is not None:
+            digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+def samples_fingerprint(exposure_percentages):
+    """
+    Oblicza skrót zestawu próbek ekspozycji o stałym rozmiarze, używany w kluczach etapów.
+
+    Args:
+        exposure_percentages (list): Wartości ekspozycji (%)
+
+    Returns:
+        str: Skrót szesnastkowy
+    """
+    values = np.ascontiguousarray(exposure_percentages, dtype=np.float64)
+    return hashlib.blake2b(values.tobytes(), digest_size=16).hexdigest()
@@ -13,8 +13,14 @@ document.addEventListener('DOMContentLoaded', function() {
     let analysisData = null;
     let curveChart = null;
     
+    // Szerokość wykresu w pikselach - serwer przerzedza krzywe do tej liczby punktów
+    function chartWidth() {
+        const container = document.getElementById('curve-chart').parentElement;
+        return Math.round(container.clientWidth || window.innerWidth);
+    }
+    
     // Sprawdź, czy mamy już dane analizy (np. z trasy testowej)
-    fetch('/api/analyze', {
+    fetch(`/api/analyze?${new URLSearchParams({ 'width': chartWidth() })}`, {
         method: 'GET'
     })
     .then(response => {
@@ -37,22 +43,72 @@ document.addEventListener('DOMContentLoaded', function() {
         console.error('Error:', error);
     });
     
+    // Wczytanie listy LUT z biblioteki serwera
+    const libraryGroup = document.getElementById('library-group');
+    const librarySelect = document.getElementById('library-lut');
+    
+    fetch('/api/luts')
+    .then(response => response.ok ? response.json() : null)
+    .then(data => {
+        if (!data || data.luts.length === 0) return;
+        
+        data.luts.forEach(lut => {
+            const option = document.createElement('option');
+            option.value = lut.name;
+            option.textContent = lut.title ? `${lut.name} (${lut.title})` : lut.name;
+            librarySelect.appendChild(option);
+        });
+        libraryGroup.style.display = 'block';
+    })
+    .catch(error => {
+        console.error('Error:', error);
+    });
+    
     // Obsługa przesyłania formularza
     uploadForm.addEventListener('submit', function(e) {
         e.preventDefault();
         
         const formData = new FormData(uploadForm);
+        formData.append('width', chartWidth());
         const fileInput = document.getElementById('cube-file');
         const colorSpace = document.getElementById('color-space').value;
+        const libraryLut = librarySelect.value;
         
-        // Walidacja formularza
-        if (!fileInput.files[0]) {
-            showAlert('Proszę wybrać plik .CUBE', 'error');
+        if (!colorSpace) {
+            showAlert('Proszę wybrać przestrzeń barwną', 'error');
             return;
         }
         
-        if (!colorSpace) {
-            showAlert('Proszę wybrać przestrzeń barwną', 'error');
+        // LUT z biblioteki nie wymaga przesyłania pliku
+        if (libraryLut && !fileInput.files[0]) {
+            showLoading(true);
+            
+            const params = new URLSearchParams({ 'lut': libraryLut, 'color-space': colorSpace, 'width': chartWidth() });
+            fetch(`/api/analyze?${params}`, {
+                method: 'GET'
+            })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Błąd podczas analizy pliku');
+                }
+                return response.json();
+            })
+            .then(data => {
+                analysisData = data;
+                showResults();
+                showLoading(false);
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                showAlert(error.message, 'error');
+                showLoading(false);
+            });
+            return;
+        }
+        
+        // Walidacja formularza
+        if (!fileInput.files[0]) {
+            showAlert('Proszę wybrać plik .CUBE', 'error');
             return;
         }
         
@@ -144,6 +200,7 @@ document.addEventListener('DOMContentLoaded', function() {
         const slog3Values = analysisData.slog3_percentages;
         const rec709Values = analysisData.rec709_percentages;
         const lutValues = analysisData.lut_percentages;
+        const logCurve = analysisData.lut_info.log_curve || 'S-Log3';
         
         // Konfiguracja wykresu
         curveChart = new Chart(ctx, {
@@ -152,7 +209,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 labels: exposureValues,
                 datasets: [
                     {
-                        label: 'S-Log3',
+                        label: logCurve,
                         data: slog3Values,
                         borderColor: 'rgba(54, 162, 235, 1)',
                         backgroundColor: 'rgba(54, 162, 235, 0.1)',
@@ -220,6 +277,7 @@ document.addEventListener('DOMContentLoaded', function() {
     function generateTable() {
         const tableBody = document.getElementById('table-body');
         tableBody.innerHTML = '';
+        document.getElementById('log-curve-header').textContent = `${analysisData.lut_info.log_curve || 'S-Log3'} (%)`;
         
         // Dane do tabeli
         const exposureValues = analysisData.exposure_percentages;
@@ -16,4 +16,13 @@ setup(
         "pillow>=10.0.0",
         "reportlab>=4.0.4",
     ],
+    extras_require={
+        "tiff": ["tifffile>=2023.7.10"],
+    },
+    entry_points={
+        "console_scripts": [
+            "pixelpasta-sequence=pixelpasta.lut_processor.sequence_pipeline:main",
+            "pixelpasta-catalog=pixelpasta.lut_processor.lut_catalog:main",
+        ],
+    },
 )